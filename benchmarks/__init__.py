@@ -0,0 +1,7 @@
+"""
+Benchmarks of chkapi hot paths on synthetic JSON bodies.
+
+    python -m benchmarks                   # compare with baseline.json
+    python -m benchmarks --update          # write new baseline
+    python -m benchmarks --sizes 1K,500M   # bodies from 1 KB to 500 MB
+"""
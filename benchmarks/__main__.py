@@ -0,0 +1,147 @@
+import argparse
+import gc
+import json
+import sys
+import timeit
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from benchmarks.bodies import format_size, parse_size
+from benchmarks.cases import BODY_CASES, HISTORY_CASES, Run, environment, select
+
+BASELINE = Path(__file__).parent / "baseline.json"
+SIZES = "1K,100K,1M,10M"
+HISTORY_SIZES = "1000,100000"
+REPEAT = 5
+REPEAT_SIZE_LIMIT = 10 * 1024 * 1024
+TOLERANCE = 0.25
+NOISE = 0.001
+
+
+def measure(run: Run, repeat: int) -> float:
+    """Best time of `repeat` runs, with garbage collection paused."""
+    times = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = timeit.default_timer()
+            run()
+            times.append(timeit.default_timer() - start)
+    finally:
+        gc.enable()
+    return min(times)
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], tolerance: float
+) -> List[str]:
+    """
+    Names of benchmarks slower than baseline by more than tolerance.
+    Differences under a millisecond are treated as noise.
+
+    >>> baseline = {"a": 0.1, "b": 0.1, "c": 0.0001}
+    >>> compare({"a": 0.11, "b": 0.2, "c": 0.0005, "d": 1.0}, baseline, 0.25)
+    ['b']
+    """
+    return [
+        name
+        for name, seconds in results.items()
+        if name in baseline
+        and seconds > baseline[name] * (1 + tolerance)
+        and seconds - baseline[name] > NOISE
+    ]
+
+
+def load_baseline(path: Path) -> Dict[str, float]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_baseline(path: Path, results: Dict[str, float]):
+    baseline = load_baseline(path)
+    baseline.update(results)
+    path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+
+
+def run_benchmarks(
+    sizes: List[int], history_sizes: List[int], only: Optional[List[str]], repeat: int
+) -> Iterator[Tuple[str, float]]:
+    env = environment()
+    try:
+        for size in sizes:
+            for name, case in select(BODY_CASES, only).items():
+                runs = repeat if size <= REPEAT_SIZE_LIMIT else 1
+                yield f"{name}[{format_size(size)}]", measure(case(size, env), runs)
+        for count in history_sizes:
+            for name, case in select(HISTORY_CASES, only).items():
+                yield f"{name}[{count}]", measure(case(count, env), repeat)
+    finally:
+        env.close()
+
+
+def format_row(name: str, seconds: float, baseline: Optional[float]) -> str:
+    """
+    >>> format_row("line_at[1K]", 0.0015, 0.001)
+    'line_at[1K]                                   1.500 ms     +50.0%'
+    """
+    row = f"{name:<40} {seconds * 1000:>10.3f} ms"
+    if baseline:
+        row += f" {(seconds - baseline) / baseline:>+10.1%}"
+    return row
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Time chkapi hot paths."
+    )
+    parser.add_argument(
+        "--sizes",
+        default=SIZES,
+        help="sizes of JSON bodies, from 1K to 500M, comma separated",
+    )
+    parser.add_argument(
+        "--history", default=HISTORY_SIZES, help="urls in history, comma separated"
+    )
+    parser.add_argument(
+        "-k", "--only", action="append", help="run benchmarks with names containing"
+    )
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=TOLERANCE,
+        help="allowed slowdown against baseline, 0.25 is 25%%",
+    )
+    parser.add_argument(
+        "--update", action="store_true", help="write results to baseline"
+    )
+    return parser.parse_args(args)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    baseline = load_baseline(args.baseline)
+    results = {}
+    for name, seconds in run_benchmarks(
+        [parse_size(size) for size in args.sizes.split(",")],
+        [int(count) for count in args.history.split(",") if count],
+        args.only,
+        args.repeat,
+    ):
+        results[name] = seconds
+        print(format_row(name, seconds, baseline.get(name)), flush=True)
+    if args.update or not baseline:
+        save_baseline(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for name in regressions:
+        print(f"Regression: {format_row(name, results[name], baseline[name])}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import json
+import re
+
+UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3}
+
+_SIZE = re.compile(r"(\d+)([KMG]?)B?", re.IGNORECASE)
+
+
+def parse_size(size: str) -> int:
+    """
+    >>> parse_size("1K"), parse_size("500MB"), parse_size("10")
+    (1024, 524288000, 10)
+    """
+    match = _SIZE.fullmatch(size.strip())
+    if match is None:
+        raise ValueError(f"Invalid size: {size}")
+    return int(match.group(1)) * UNITS[match.group(2).upper()]
+
+
+def format_size(size: int) -> str:
+    """
+    >>> format_size(1024), format_size(500 * 1024 * 1024), format_size(100)
+    ('1K', '500M', '100')
+    """
+    for unit in ("G", "M", "K"):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return str(size)
+
+
+def record(index: int) -> str:
+    return json.dumps(
+        {
+            "id": index,
+            "name": f"Item {index}",
+            "url": f"http://localhost/items/{index}",
+            "active": index % 3 == 0,
+            "price": index * 0.25,
+            "tags": ["api", "test", f"group-{index % 10}"],
+            "owner": {"id": index % 100, "login": f"user{index % 100}"},
+        }
+    )
+
+
+def json_body(size: int) -> str:
+    """
+    JSON array of records, at least `size` characters long.
+
+    >>> body = json_body(1024)
+    >>> len(body) >= 1024, json.loads(body)[1]["id"]
+    (True, 1)
+    """
+    records = []
+    length = 2
+    index = 0
+    while length < size:
+        records.append(record(index))
+        length += len(records[-1]) + 2
+        index += 1
+    return "[" + ", ".join(records) + "]"
+
+
+def history_urls(count: int) -> list:
+    """
+    >>> history_urls(2)
+    ['http://api0.example.com/v1/items/0?page=0', 'http://api1.example.com/v1/users/1?page=1']
+    """
+    kinds = ("items", "users", "orders", "search")
+    return [
+        f"http://api{i % 50}.example.com/v1/{kinds[i % len(kinds)]}/{i}?page={i % 7}"
+        for i in range(count)
+    ]
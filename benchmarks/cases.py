@@ -0,0 +1,285 @@
+import asyncio
+import itertools
+import logging
+import random
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.bodies import history_urls, json_body
+
+SCREEN_HEIGHT = 50
+LOOKUPS = 1000
+
+Run = Callable[[], Any]
+
+
+@dataclass
+class Environment:
+    """Things shared by benchmark cases, created on first use."""
+
+    loop: asyncio.AbstractEventLoop
+    tmpdir: Path
+    _server: Any = None
+    _bodies: Dict[int, str] = field(default_factory=dict)
+    _readers: List[Any] = field(default_factory=list)
+    _indexes: List[Any] = field(default_factory=list)
+
+    def body(self, size: int) -> str:
+        if size not in self._bodies:
+            self._bodies.clear()
+            self._bodies[size] = json_body(size)
+        return self._bodies[size]
+
+    @property
+    def server(self):
+        if self._server is None:
+            from pytest_httpserver import HTTPServer
+
+            logging.getLogger("werkzeug").setLevel(logging.ERROR)
+            self._server = HTTPServer()
+            self._server.start()
+        return self._server
+
+    def run(self, coroutine) -> Any:
+        return self.loop.run_until_complete(coroutine)
+
+    def reader(self, **kwargs):
+        from chkapi.api_reader import AsyncAPIReader
+
+        self._readers.append(AsyncAPIReader(**kwargs))
+        return self._readers[-1]
+
+    def body_index(self, name: str, **kwargs):
+        from chkapi.body_index import BodyIndex
+
+        self._indexes.append(BodyIndex(self.tmpdir / name, **kwargs))
+        return self._indexes[-1]
+
+    def close(self):
+        for reader in self._readers:
+            self.run(reader.close())
+        for index in self._indexes:
+            index.close()
+        if self._server is not None:
+            self._server.stop()
+        self.loop.close()
+        tempfile.tempdir = None
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+def search_results(size: int, env: Environment) -> Run:
+    from chkapi.search import SearchResults
+
+    body = env.body(size)
+
+    def run():
+        SearchResults("user42", body).consume_all()
+
+    return run
+
+
+def search_spooled(size: int, env: Environment) -> Run:
+    from chkapi.search import SearchResults
+    from chkapi.spool import SpooledText
+
+    body = SpooledText.from_parts([env.body(size)])
+
+    def run():
+        SearchResults("user42", body).consume_all()
+
+    return run
+
+
+def _document(size: int, env: Environment):
+    from chkapi.document import Document
+
+    return Document.from_body(env.body(size), max_size=size * 2)
+
+
+def highlight_found_phrases(size: int, env: Environment) -> Run:
+    from chkapi.search import SearchResults
+    from chkapi.views import ContentView
+
+    view = ContentView()
+    view.document = _document(size, env)
+    view.search_results = SearchResults('"id"', view.document.plain)
+    view.search_results.consume_all()
+    middle = len(view.document) // 2
+
+    def run():
+        view._highlight_found_phrases(middle, middle + SCREEN_HEIGHT)
+
+    return run
+
+
+def line_at(size: int, env: Environment) -> Run:
+    document = _document(size, env)
+    offsets = random.Random(0).choices(range(len(document.plain)), k=LOOKUPS)
+
+    def run():
+        for offset in offsets:
+            document.line_at(offset)
+
+    return run
+
+
+def render_lines(size: int, env: Environment) -> Run:
+    document = _document(size, env)
+    middle = len(document) // 2
+
+    def run():
+        document._styled.clear()
+        document.render_lines(middle, middle + SCREEN_HEIGHT)
+
+    return run
+
+
+def set_content(size: int, env: Environment) -> Run:
+    from chkapi.document import DocumentCache
+    from chkapi.views import ContentView
+
+    body = env.body(size)
+    view = ContentView()
+
+    def run():
+        view.documents = DocumentCache()
+        env.run(view.set_content(body))
+
+    return run
+
+
+def read_url(size: int, env: Environment) -> Run:
+    from chkapi.api_reader import URL
+
+    path = f"/body/{size}"
+    env.server.expect_request(path).respond_with_data(
+        env.body(size), content_type="application/json"
+    )
+    url = URL(env.server.url_for(path))
+    reader = env.reader(max_body_size=size * 2)
+
+    async def read():
+        response = await reader.read_url(url)
+        assert len(response.body) >= size
+
+    def run():
+        env.run(read())
+
+    return run
+
+
+def body_index_search(size: int, env: Environment) -> Run:
+    index = env.body_index(f"index-{size}.db", max_size=size * 2)
+    env.run(index.add(f"http://localhost/body/{size}", env.body(size)))
+
+    def run():
+        assert env.run(index.search("group-1"))
+
+    return run
+
+
+def _sqlite_storage(count: int, env: Environment):
+    from chkapi.storages import SQLiteStorage
+
+    storage = SQLiteStorage(env.tmpdir / f"history-{count}.db")
+    storage.connection.execute("DELETE FROM urls")
+    now = time.time()
+    storage.connection.executemany(
+        "INSERT INTO urls (url, hits, last_used) VALUES (?, ?, ?)",
+        ((url, i % 9 + 1, now - i) for i, url in enumerate(history_urls(count))),
+    )
+    env.run(storage.find("api"))
+    return storage
+
+
+def sqlite_save(count: int, env: Environment) -> Run:
+    storage = _sqlite_storage(count, env)
+    counter = itertools.count()
+
+    def run():
+        env.run(storage.save(f"http://new.example.com/{next(counter)}"))
+
+    return run
+
+
+def sqlite_find(count: int, env: Environment) -> Run:
+    storage = _sqlite_storage(count, env)
+
+    def run():
+        env.run(storage.find("http://api1"))
+        env.run(storage.find("users/1"))
+
+    return run
+
+
+def _temp_file_storage(count: int, env: Environment):
+    from chkapi.storages import TempFileStorage
+
+    directory = env.tmpdir / f"files-{count}"
+    directory.mkdir(exist_ok=True)
+    tempfile.tempdir = str(directory)
+    storage = TempFileStorage()
+    storage._write_lines(directory, history_urls(count))
+    return storage
+
+
+def temp_file_save(count: int, env: Environment) -> Run:
+    storage = _temp_file_storage(count, env)
+    counter = itertools.count()
+
+    def run():
+        env.run(storage.save(f"http://new.example.com/{next(counter)}"))
+
+    return run
+
+
+def temp_file_find(count: int, env: Environment) -> Run:
+    storage = _temp_file_storage(count, env)
+
+    def run():
+        env.run(storage.find("users/1"))
+
+    return run
+
+
+BODY_CASES: Dict[str, Callable[[int, Environment], Run]] = {
+    "search_results": search_results,
+    "search_spooled": search_spooled,
+    "highlight_found_phrases": highlight_found_phrases,
+    "line_at": line_at,
+    "render_lines": render_lines,
+    "set_content": set_content,
+    "read_url": read_url,
+    "body_index_search": body_index_search,
+}
+
+HISTORY_CASES: Dict[str, Callable[[int, Environment], Run]] = {
+    "sqlite_storage_save": sqlite_save,
+    "sqlite_storage_find": sqlite_find,
+    "temp_file_storage_save": temp_file_save,
+    "temp_file_storage_find": temp_file_find,
+}
+
+
+def select(cases: Dict[str, Any], only: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    >>> list(select(BODY_CASES, ["search_results", "line_at"]))
+    ['search_results', 'line_at']
+    """
+    if not only:
+        return cases
+    return {
+        name: case
+        for name, case in cases.items()
+        if any(pattern in name for pattern in only)
+    }
+
+
+def environment() -> Environment:
+    return Environment(
+        loop=asyncio.new_event_loop(), tmpdir=Path(tempfile.mkdtemp("-chkapi-bench"))
+    )
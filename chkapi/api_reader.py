@@ -1,24 +1,138 @@
+import codecs
+import timeit
 from dataclasses import dataclass
+from enum import Enum
 from http import HTTPStatus
-from typing import Dict, Protocol
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Protocol,
+    Tuple,
+    Union,
+)
 from urllib.parse import urlparse
 
-import httpx
-
 from chkapi.exceptions import BadUrlException, HttpError
+from chkapi.spool import SPOOL_SIZE, SpooledText, Spooler
+
+if TYPE_CHECKING:
+    import httpx
+
+MAX_CONNECTIONS = 10
+MAX_KEEPALIVE_CONNECTIONS = 5
+KEEPALIVE_EXPIRY = 30.0
+MAX_BODY_SIZE = 500 * 1024 * 1024
+
+STATUS_DESCRIPTIONS: Dict[int, str] = {
+    status.value: f"{status.phrase}: {status.description}" for status in HTTPStatus
+}
+
+
+class CacheStatus(Enum):
+    HIT = "hit"
+    REVALIDATED = "revalidated"
+    MISS = "miss"
+
+
+@dataclass
+class Timing:
+    """
+    Seconds spent in phases of a request. DNS lookup is part of
+    connect. Connect and tls are None when a kept alive connection
+    was reused.
+    """
+
+    total: float
+    connect: Optional[float] = None
+    tls: Optional[float] = None
+    send: float = 0.0
+    wait: float = 0.0
+    download: float = 0.0
+
+
+class TimingTrace:
+    """
+    Collects times of httpcore trace events of a single request.
+
+    >>> trace = TimingTrace()
+    >>> trace.events = {"start_tls.started": 1.0, "start_tls.complete": 1.5}
+    >>> trace.between("start_tls.started", "start_tls.complete")
+    0.5
+    >>> trace.between("connect_tcp.started", "connect_tcp.complete")
+    """
+
+    start: float
+    events: Dict[str, float]
+
+    def __init__(self) -> None:
+        self.start = timeit.default_timer()
+        self.events = {}
+
+    async def __call__(self, name: str, info: dict) -> None:
+        _, _, event = name.partition(".")
+        self.events[event] = timeit.default_timer()
+
+    def between(self, start: str, stop: str) -> Optional[float]:
+        if start not in self.events or stop not in self.events:
+            return None
+        return self.events[stop] - self.events[start]
+
+    def timing(self) -> Timing:
+        end = timeit.default_timer()
+        headers_received = self.events.get("receive_response_headers.complete", end)
+        return Timing(
+            total=end - self.start,
+            connect=self.between("connect_tcp.started", "connect_tcp.complete"),
+            tls=self.between("start_tls.started", "start_tls.complete"),
+            send=self.between(
+                "send_request_headers.started", "send_request_body.complete"
+            )
+            or 0.0,
+            wait=self.between(
+                "send_request_body.complete", "receive_response_headers.complete"
+            )
+            or 0.0,
+            download=end - headers_received,
+        )
 
 
 class Response:
-    body: str
+    body: Union[str, SpooledText]
     headers: dict
+    truncated: bool
+    status_code: int
+    cache_status: Optional[CacheStatus]
+    timing: Optional[Timing]
 
-    def __init__(self, body: str, headers: dict) -> None:
+    def __init__(
+        self,
+        body: Union[str, SpooledText],
+        headers: dict,
+        truncated: bool = False,
+        status_code: int = 200,
+        cache_status: Optional[CacheStatus] = None,
+        timing: Optional[Timing] = None,
+    ) -> None:
         self.body = body
         self.headers = headers
+        self.truncated = truncated
+        self.status_code = status_code
+        self.cache_status = cache_status
+        self.timing = timing
 
     def __eq__(self, other):
         return self.body == other.body and self.headers == other.headers
 
+    @property
+    def size(self) -> int:
+        """Bytes of the body encoded in UTF-8."""
+        if isinstance(self.body, SpooledText):
+            return len(self.body)
+        return len(self.body.encode("utf-8"))
+
 
 @dataclass
 class URL:
@@ -30,39 +144,190 @@ class URL:
             raise BadUrlException("Invalid URL")
 
 
+@dataclass
+class Progress:
+    received: int
+    total: Optional[int]
+    elapsed: float
+
+    @property
+    def rate(self) -> float:
+        """
+        >>> Progress(received=2048, total=None, elapsed=2.0).rate
+        1024.0
+        >>> Progress(received=2048, total=None, elapsed=0).rate
+        0.0
+        """
+        if not self.elapsed:
+            return 0.0
+        return self.received / self.elapsed
+
+
+ProgressCallback = Callable[[Progress], None]
+ChunkCallback = Callable[[str], Awaitable[None]]
+
+
 class APIReader(Protocol):
-    async def read_url(self, url: URL) -> Response:
+    async def read_url(
+        self,
+        url: URL,
+        on_progress: Optional[ProgressCallback] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        ...
+
+    async def close(self) -> None:
         ...
 
 
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
 class AsyncAPIReader(object):
-    status_list: Dict[int, str]
+    """
+    Reads urls with a pooled httpx client. httpx is imported when the
+    first reader is created, so commands which don't read urls start
+    without it.
+    """
 
-    def __init__(self) -> None:
-        self.status_list = self._get_status_list()
-
-    def _get_status_list(self):
-        return dict(
-            [
-                (status.value, f"{status.phrase}: {status.description}")
-                for status in vars(HTTPStatus).values()
-                if isinstance(status, HTTPStatus)
-            ]
+    status_list: Dict[int, str] = STATUS_DESCRIPTIONS
+    limits: "httpx.Limits"
+    http2: bool
+    max_body_size: int
+    spool_size: int
+
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = KEEPALIVE_EXPIRY,
+        http2: bool = False,
+        max_body_size: int = MAX_BODY_SIZE,
+        spool_size: int = SPOOL_SIZE,
+    ) -> None:
+        import httpx
+
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
         )
+        self.http2 = http2 and http2_available()
+        self.max_body_size = max_body_size
+        self.spool_size = spool_size
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        import httpx
+
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(limits=self.limits, http2=self.http2)
+        return self._client
+
+    async def read_url(
+        self,
+        url: URL,
+        on_progress: Optional[ProgressCallback] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        import httpx
 
-    async def read_url(self, url: URL) -> Response:
         if not url:
             raise BadUrlException()
 
-        async with httpx.AsyncClient() as client:
-            try:
-                result = await client.get(url.url)
-            except httpx.ConnectError:
-                raise HttpError("Connection Error")
-            except Exception as e:
-                raise HttpError(str(e))
+        trace = TimingTrace()
+        try:
+            async with self.client.stream(
+                "GET", url.url, headers=headers, extensions={"trace": trace}
+            ) as result:
+                if result.status_code == 304:
+                    return Response(
+                        "",
+                        headers=result.headers,
+                        status_code=304,
+                        timing=trace.timing(),
+                    )
+                if result.status_code != 200:
+                    raise HttpError(
+                        self.status_list.get(
+                            result.status_code, str(result.status_code)
+                        ),
+                        status_code=result.status_code,
+                    )
+                body, truncated = await self._read_body(result, on_progress, on_chunk)
+        except HttpError:
+            raise
+        except httpx.ConnectError:
+            raise HttpError("Connection Error")
+        except Exception as e:
+            raise HttpError(str(e))
+
+        return Response(
+            body, headers=result.headers, truncated=truncated, timing=trace.timing()
+        )
+
+    async def _read_body(
+        self,
+        result: "httpx.Response",
+        on_progress: Optional[ProgressCallback],
+        on_chunk: Optional[ChunkCallback],
+    ) -> Tuple[Union[str, SpooledText], bool]:
+        """
+        Decoded body, kept in a str or, once more than `spool_size`
+        bytes are received, written to a temporary file. Chunks are
+        passed to on_chunk only until then, so they aren't kept in
+        memory elsewhere.
+        """
+        start = timeit.default_timer()
+        total = self._content_length(result)
+        decoder = codecs.getincrementaldecoder(result.encoding or "utf-8")(
+            errors="replace"
+        )
+        parts = []
+        spooler: Optional[Spooler] = None
+        received = 0
+        truncated = False
+        async for chunk in result.aiter_bytes():
+            if received + len(chunk) > self.max_body_size:
+                chunk = chunk[: self.max_body_size - received]
+                truncated = True
+            received += len(chunk)
+            text = decoder.decode(chunk, final=truncated)
+            if spooler is not None:
+                spooler.write(text)
+            else:
+                parts.append(text)
+                if received > self.spool_size:
+                    spooler = Spooler()
+                    spooler.write("".join(parts))
+                    parts = []
+            if on_chunk and text and spooler is None:
+                await on_chunk(text)
+            if on_progress:
+                on_progress(Progress(received, total, timeit.default_timer() - start))
+            if truncated:
+                break
+        if spooler is not None:
+            spooler.write(decoder.decode(b"", final=True))
+            return spooler.finish(), truncated
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts), truncated
 
-            if result.status_code != 200:
-                raise HttpError(self.status_list[result.status_code])
+    def _content_length(self, result: "httpx.Response") -> Optional[int]:
+        try:
+            return int(result.headers["content-length"])
+        except (KeyError, ValueError):
+            return None
 
-            return Response(result.text, headers=result.headers)
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
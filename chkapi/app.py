@@ -1,109 +1,406 @@
-import sys
+import asyncio
+import threading
 import timeit
+from functools import partial
+from typing import List, Optional, Set
 
 from textual import events
 from textual.app import App
 
-from chkapi.api_reader import URL, APIReader, AsyncAPIReader
-from chkapi.events import SetUrl
-from chkapi.exceptions import BadUrlException, HttpError
-from chkapi.storages import Storage, TempFileStorage
+from chkapi.api_reader import URL, APIReader, AsyncAPIReader, Progress, Response
+from chkapi.body_index import BodyIndex
+from chkapi.events import (
+    FormattingChanged,
+    LinkSelected,
+    OpenLink,
+    SearchAll,
+    SearchResultsChanged,
+    SetUrl,
+)
+from chkapi.exceptions import BadUrlException, HttpError, PaginationError
+from chkapi.links import find_links, rank_links
+from chkapi.load_test import run_load_test
+from chkapi.pagination import (
+    MAX_MERGED_SIZE,
+    MAX_PAGES,
+    follow_pages,
+    next_page_url,
+    parse_json,
+)
+from chkapi.prefetch import (
+    PREFETCH_CONCURRENCY,
+    PREFETCH_LINKS,
+    PREFETCH_SIZE,
+    Prefetcher,
+)
+from chkapi.profiler import profiler
+from chkapi.storages import SQLiteStorage, Storage
+from chkapi.tabs import Tab
 from chkapi.views import ContentView, URLView
 from chkapi.widgets import (
     ApiFooter,
     AutocompleteWidget,
+    BodyMatchesWidget,
     CommandPrompt,
+    GlobalSearchPrompt,
     HeadersWidget,
+    LoadTestWidget,
     MessageWidget,
+    TabsWidget,
+    TimingWidget,
 )
 
+AUTOCOMPLETE_DEBOUNCE = 0.05
+PAGES_UPDATE_INTERVAL = 0.5
+
 
 class CheckApiApp(App):
     api_reader: APIReader
     storage: Storage
+    body_index: BodyIndex
 
     footer: ApiFooter
     url_view: URLView
-    body: ContentView
+    tabs_bar: TabsWidget
     command_prompt: CommandPrompt
+    global_search: GlobalSearchPrompt
+    body_matches: BodyMatchesWidget
     message: MessageWidget
     headers: HeadersWidget
+    timing: TimingWidget
+    load_test: LoadTestWidget
+    pending_lookup: Optional[asyncio.Future] = None
+    pending_body_search: Optional[asyncio.Future] = None
+    tabs: List[Tab]
+    current_tab: int = 0
 
     def __init__(
-        self, url: str = "", api_reader=None, storage: Storage = None, **kwargs
+        self,
+        url: str = "",
+        api_reader=None,
+        storage: Storage = None,
+        body_index: Optional[BodyIndex] = None,
+        load_requests: int = 100,
+        load_concurrency: int = 10,
+        max_pages: int = MAX_PAGES,
+        max_merged_size: int = MAX_MERGED_SIZE,
+        prefetch_links: int = PREFETCH_LINKS,
+        prefetch_concurrency: int = PREFETCH_CONCURRENCY,
+        prefetch_size: int = PREFETCH_SIZE,
+        **kwargs,
     ):
         super().__init__(**kwargs)
         self.url = url
         self.api_reader = api_reader or AsyncAPIReader()
-        self.storage = storage or TempFileStorage()
+        self.storage = storage or SQLiteStorage()
+        self.body_index = body_index or BodyIndex()
+        self._indexing: Set[asyncio.Future] = set()
+        self.load_requests = load_requests
+        self.load_concurrency = load_concurrency
+        self.max_pages = max_pages
+        self.max_merged_size = max_merged_size
+        self.prefetch_links = prefetch_links
+        self.prefetcher = Prefetcher(
+            self.api_reader,
+            max_concurrency=prefetch_concurrency,
+            max_size=prefetch_size,
+        )
+        self.tabs = []
+        self._spare_bodies: List[ContentView] = []
 
     @classmethod
-    def run(cls, url=None):
-        super().run(title="Rest Checker", log="textual.log", url=url)
+    def run(cls, url=None, api_reader=None, **kwargs):
+        super().run(
+            title="Rest Checker",
+            log="textual.log",
+            url=url,
+            api_reader=api_reader,
+            **kwargs,
+        )
+
+    async def process_messages(self) -> None:
+        lag = asyncio.ensure_future(profiler.watch_loop()) if profiler.enabled else None
+        try:
+            await super().process_messages()
+        finally:
+            if lag is not None:
+                lag.cancel()
+            self.prefetcher.cancel()
+            await self.api_reader.close()
+            self.body_index.close()
+
+    async def dispatch_message(self, message):
+        prefix = "on" if isinstance(message, events.Event) else "handle"
+        name = f"{prefix}_{message.name}"
+        if not profiler.enabled or not hasattr(self, name):
+            return await super().dispatch_message(message)
+        with profiler.span(name):
+            return await super().dispatch_message(message)
+
+    @property
+    def tab(self) -> Tab:
+        return self.tabs[self.current_tab]
+
+    @property
+    def body(self) -> ContentView:
+        return self.tab.body
+
+    @property
+    def response(self):
+        return self.tab.response
+
+    @property
+    def loaded_url(self) -> Optional[str]:
+        return self.tab.loaded_url
+
+    @property
+    def next_url(self) -> Optional[str]:
+        return self.tab.next_url
 
     async def on_mount(self):
-        self.body = ContentView()
         self.url_view = URLView(self.url)
+        self.tabs_bar = TabsWidget()
         self.footer = ApiFooter()
         self.command_prompt = CommandPrompt()
+        self.global_search = GlobalSearchPrompt()
+        self.body_matches = BodyMatchesWidget()
         self.message = MessageWidget()
         self.headers = HeadersWidget()
+        self.timing = TimingWidget()
+        self.load_test = LoadTestWidget()
         self.autocomplete = AutocompleteWidget()
         await self.view.dock(self.url_view, size=3, edge="top")
+        await self.view.dock(self.tabs_bar, size=1, edge="top")
         await self.view.dock(self.autocomplete, edge="top", z=1)
+        await self.view.dock(self.global_search, size=3, edge="bottom", z=1)
+        await self.view.dock(self.body_matches, edge="top", z=1)
         await self.view.dock(self.message, size=3, edge="top", z=1)
         await self.view.dock(self.headers, edge="top", z=1)
+        await self.view.dock(self.timing, edge="top", z=1)
+        await self.view.dock(self.load_test, edge="top", z=1)
         await self.view.dock(self.footer, edge="bottom")
-        await self.view.dock(self.body, edge="top")
+        self.tabs.append(Tab(await self._dock_body(), url=self.url))
+        self.tab.body.visible = True
         await self.view.dock(self.command_prompt, size=3, edge="bottom", z=1)
 
-    async def load_url(self, url):
+    async def _dock_body(self) -> ContentView:
+        if self._spare_bodies:
+            return self._spare_bodies.pop()
+        body = ContentView()
+        body.visible = False
+        await self.view.dock(body, edge="top")
+        return body
+
+    async def load_url(self, url, tab: Optional[Tab] = None):
+        tab = tab or self.tab
         if not url:
             return self.message.show("Url is required")
+        await tab.body.start_streaming()
         try:
-            content, response_time = await self._get_content_with_time(url)
+            response, response_time = await self._get_content_with_time(url, tab)
         except (HttpError, BadUrlException) as e:
-            self.message.show(str(e))
+            tab.error = str(e)
+            if tab is self.tab:
+                self.message.show(str(e))
             return False
+        finally:
+            if tab is self.tab:
+                self.footer.progress = None
         await self.storage.save(url)
-        await self.body.set_content(content)
-        self.footer.response_time = response_time
-        await self.body.focus()
+        tab.response = response
+        tab.response_time = response_time
+        tab.loaded_url = url
+        tab.error = None
+        await tab.body.set_content(response.body)
+        self.index_body(url, response)
+        if tab is self.tab:
+            self.show_tab_status()
+            if response.truncated:
+                self.message.show("Response too large, showing truncated preview")
+            await tab.body.focus()
         return True
 
-    async def _get_content_with_time(self, url):
+    def index_body(self, url: str, response: Response):
+        """Adds body to the index in background, after it is shown."""
+        indexing = asyncio.ensure_future(self.body_index.add(url, response.body))
+        self._indexing.add(indexing)
+        indexing.add_done_callback(self._indexing.discard)
+
+    async def _get_content_with_time(self, url, tab: Optional[Tab] = None):
         start = timeit.default_timer()
-        self.response = await self._get_url_content(url)
+        with profiler.span("fetch", "load", url=url):
+            response = await self._get_url_content(url, tab)
         response_time = timeit.default_timer() - start
-        return (self.response.body, response_time)
+        return (response, response_time)
 
-    async def bind(self, keys: str, action: str, description: str = "") -> None:
-        await super().bind(keys, action, description=description)
+    def show_tab_status(self):
+        tab = self.tab
+        self.footer.progress = None
+        self.footer.formatting = tab.body.formatting
+        self.footer.response_time = tab.response_time
+        self.footer.cache_status = tab.response.cache_status if tab.response else None
+
+    async def bind(
+        self, keys: str, action: str, description: str = "", show: bool = True
+    ) -> None:
+        await super().bind(keys, action, description=description, show=show)
         if hasattr(self, "footer"):
             self.footer.update_keys()
             self.footer.refresh()
 
     async def unbind(self, key):
-        self.bindings.keys.pop(key)
+        self.bindings.keys.pop(key, None)
         self.footer.update_keys()
 
     async def on_load(self):
         await self.bind("q", "quit", "Quit")
+        await self.bind("ctrl+t", "new_tab", "New tab", show=False)
+        await self.bind("ctrl+w", "close_tab", "Close tab", show=False)
+        await self.bind("ctrl+n", "switch_tab(1)", "Next tab", show=False)
+        await self.bind("ctrl+p", "switch_tab(-1)", "Previous tab", show=False)
+        await self.bind("ctrl+f", "search_all", "Search all", show=False)
 
     async def handle_url_changed(self):
-        loaded = await self.load_url(self.url_view.url)
+        self.cancel_lookup()
+        tab = self.tab
+        tab.cancel()
+        tab.url = self.url_view.url
+        tab.loading = asyncio.ensure_future(self.load_and_bind(tab.url, tab))
+        tab.loading.add_done_callback(lambda _: self.update_tabs_bar())
+        self.update_tabs_bar()
+
+    async def load_and_bind(self, url, tab: Optional[Tab] = None):
+        tab = tab or self.tab
+        with profiler.load(url):
+            loaded = await self.load_url(url, tab)
         if loaded:
-            await self.bind("/", "search", "Search")
-            await self.bind("h", "show_headers", "Headers")
+            await self.find_next_page(url, tab)
+            await self.find_links(url, tab)
+            if tab is self.tab:
+                await self.bind_tab_keys()
+
+    async def bind_tab_keys(self):
+        tab = self.tab
+        for key, action, description, bound in (
+            ("/", "search", "Search", tab.response),
+            ("h", "show_headers", "Headers", tab.response),
+            ("t", "show_timing", "Timing", tab.response),
+            ("l", "load_test", "Load test", tab.response),
+            ("]", "next_page", "Next page", tab.next_url),
+            ("a", "all_pages", "All pages", tab.next_url),
+            ("f", "next_link", "Links", tab.body.links),
+        ):
+            if bound:
+                await self.bind(key, action, description)
+            else:
+                await self.unbind(key)
+
+    async def find_next_page(self, url, tab: Optional[Tab] = None):
+        tab = tab or self.tab
+        data = await asyncio.get_event_loop().run_in_executor(
+            None, parse_json, tab.response.body
+        )
+        tab.next_url = next_page_url(url, tab.response, data)
+        if tab.next_url:
+            self.prefetcher.prefetch(tab.next_url)
+
+    def is_loading(self) -> bool:
+        return self.tab.is_loading()
+
+    def cancel_loading(self):
+        if self.tab.cancel():
+            self.message.show("Request cancelled")
+
+    def show_progress(self, tab: Tab, progress: Progress):
+        if tab is self.tab:
+            self.footer.progress = progress
+
+    async def action_new_tab(self):
+        self.tabs.append(Tab(await self._dock_body()))
+        await self.action_switch_tab(len(self.tabs) - 1 - self.current_tab)
+        await self.url_view.focus()
+
+    async def action_close_tab(self):
+        if len(self.tabs) == 1:
+            return
+        tab = self.tabs.pop(self.current_tab)
+        tab.cancel()
+        tab.body.clear()
+        tab.body.visible = False
+        self._spare_bodies.append(tab.body)
+        self.current_tab = min(self.current_tab, len(self.tabs) - 1)
+        await self.action_switch_tab(0)
+
+    async def action_switch_tab(self, step: int):
+        self.current_tab = (self.current_tab + step) % len(self.tabs)
+        tab = self.tab
+        for other in self.tabs:
+            other.body.visible = other is tab
+        self.url_view.set_url(tab.url)
+        self.message.hide()
+        if tab.error:
+            self.message.show(tab.error)
+        self.show_tab_status()
+        await tab.body.report_search()
+        await self.bind_tab_keys()
+        self.update_tabs_bar()
+        await tab.body.focus()
+
+    def update_tabs_bar(self):
+        self.tabs_bar.show(
+            [tab.title + (" …" if tab.is_loading() else "") for tab in self.tabs],
+            self.current_tab,
+        )
 
     async def on_url_typed(self):
-        recent = await self.storage.find(self.url_view.url)
-        self.autocomplete.show_recent(recent)
+        self.cancel_lookup()
+        self.pending_lookup = asyncio.ensure_future(
+            self.lookup_recent(self.url_view.url)
+        )
+
+    async def lookup_recent(self, phrase: str):
+        await asyncio.sleep(AUTOCOMPLETE_DEBOUNCE)
+        self.autocomplete.show_recent(await self.storage.find(phrase))
+
+    def cancel_lookup(self):
+        if self.pending_lookup is not None:
+            self.pending_lookup.cancel()
+            self.pending_lookup = None
 
-    async def handle_cancel_search(self):
+    async def handle_search_all(self, event: SearchAll):
+        self.cancel_body_search()
+        self.pending_body_search = asyncio.ensure_future(
+            self.search_bodies(event.value)
+        )
+
+    async def search_bodies(self, phrase: str):
+        await asyncio.sleep(AUTOCOMPLETE_DEBOUNCE)
+        self.body_matches.show_matches(await self.body_index.search(phrase))
+
+    def cancel_body_search(self):
+        if self.pending_body_search is not None:
+            self.pending_body_search.cancel()
+            self.pending_body_search = None
+
+    async def hide_global_search(self):
+        self.cancel_body_search()
+        self.body_matches.hide()
+        await self.global_search.hide()
+        # Textual drops a pending layout when a repaint follows it, as
+        # moving focus does, so the hidden matches would stay on screen.
+        await self.view.refresh_layout()
+
+    async def handle_cancel_search(self, event):
+        if event.sender is self.global_search:
+            await self.hide_global_search()
+            return await self.body.focus()
         await self.body.clear_search_results()
 
-    async def handle_finish_search(self):
+    async def handle_finish_search(self, event):
+        if event.sender is self.global_search:
+            if self.body_matches.visible:
+                await self.body_matches.focus()
+            return
         await self.body.focus()
         await self.bind("n", "next_result", "Next")
 
@@ -115,7 +412,17 @@ class CheckApiApp(App):
         await self.url_view.focus()
 
     async def on_search(self, event):
-        await self.body.search(event.value)
+        await self.body.search(event.value, event.mode)
+
+    async def handle_formatting_changed(self, event: FormattingChanged):
+        if event.sender is not self.body:
+            return
+        self.footer.formatting = event.formatting
+
+    async def handle_search_results_changed(self, event: SearchResultsChanged):
+        if event.sender is not self.body:
+            return
+        self.footer.matches = event if event.found or not event.complete else None
 
     async def on_key(self, event: events.Key) -> None:
         if event.key == "enter":
@@ -124,27 +431,134 @@ class CheckApiApp(App):
             await self.url_view.focus()
         if event.key == "escape":
             self.message.hide()
-            if self.autocomplete.visible:
+            if self.is_loading():
+                self.cancel_loading()
+            elif self.autocomplete.visible:
+                self.cancel_lookup()
                 self.autocomplete.hide()
+            elif self.global_search.visible:
+                await self.hide_global_search()
+                await self.body.focus()
             else:
                 await self.body.focus()
-        return await super().on_key(event)
 
     async def action_search(self):
         await self.command_prompt.show()
 
+    async def action_search_all(self):
+        await self.global_search.show()
+
     async def action_show_headers(self):
         self.headers.show(self.response.headers)
         await self.headers.focus()
 
-    async def _get_url_content(self, url):
-        return await self.api_reader.read_url(URL(url))
+    async def action_show_timing(self):
+        self.timing.show(self.response.timing)
+        await self.timing.focus()
+
+    async def find_links(self, url, tab: Optional[Tab] = None):
+        body = (tab or self.tab).body
+        document = body.document
+        cancelled = threading.Event()
+        try:
+            links = await asyncio.get_event_loop().run_in_executor(
+                None,
+                partial(find_links, is_cancelled=cancelled.is_set),
+                document.plain,
+                url,
+            )
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        if body.document is not document:
+            return
+        body.set_links(links)
+        for link in rank_links(links, *body.visible_range())[: self.prefetch_links]:
+            self.prefetcher.prefetch(link)
+
+    async def handle_link_selected(self, event: LinkSelected):
+        self.prefetcher.prefetch(event.url)
+
+    async def handle_open_link(self, event: OpenLink):
+        if event.sender is self.body_matches:
+            await self.hide_global_search()
+        elif event.sender is not self.body:
+            return
+        self.url_view.set_url(event.url)
+        await self.handle_url_changed()
+
+    async def action_next_page(self):
+        if self.next_url and not self.is_loading():
+            self.url_view.set_url(self.next_url)
+            await self.handle_url_changed()
+
+    async def action_all_pages(self):
+        if self.loaded_url and not self.is_loading():
+            self.tab.loading = asyncio.ensure_future(
+                self.load_all_pages(self.loaded_url, self.tab)
+            )
 
+    async def load_all_pages(self, url, tab: Tab):
+        """
+        Merges items of pages, showing them from time to time, as
+        formatting all items again after every page would take long.
+        """
+        items = []
+        pages = shown_pages = 0
+        shown_at = timeit.default_timer()
+        error = None
+        try:
+            async for page in follow_pages(
+                partial(self._get_url_content, tab=tab),
+                url,
+                tab.response,
+                max_pages=self.max_pages,
+                max_size=self.max_merged_size,
+            ):
+                if page.next_url:
+                    self.prefetcher.prefetch(page.next_url)
+                items.extend(page.items)
+                pages += 1
+                if timeit.default_timer() - shown_at >= PAGES_UPDATE_INTERVAL:
+                    await tab.body.set_data(items)
+                    shown_pages = pages
+                    shown_at = timeit.default_timer()
+        except (HttpError, BadUrlException, PaginationError) as e:
+            error = str(e)
+        if pages > shown_pages:
+            await tab.body.set_data(items)
+        if tab is not self.tab:
+            return
+        if error:
+            self.message.show(f"Showing {pages} pages. {error}" if pages else error)
+        elif page.next_url:
+            self.message.show(f"Showing {pages} pages, page or size limit reached")
+
+    async def action_load_test(self):
+        self.load_test.run(
+            run_load_test(
+                self.api_reader,
+                URL(self.url_view.url),
+                self.load_requests,
+                self.load_concurrency,
+                on_update=self.load_test.update_stats,
+            )
+        )
+        await self.load_test.focus()
 
-def main():
-    url = sys.argv[1] if len(sys.argv) > 1 else ""
-    CheckApiApp.run(url)
+    async def _get_url_content(self, url, tab: Optional[Tab] = None):
+        tab = tab or self.tab
+        prefetched = await self.prefetcher.take(url)
+        if prefetched is not None:
+            return prefetched
+        return await self.api_reader.read_url(
+            URL(url),
+            on_progress=partial(self.show_progress, tab),
+            on_chunk=tab.body.feed,
+        )
 
 
 if __name__ == "__main__":
+    from chkapi.cli import main
+
     main()
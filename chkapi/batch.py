@@ -0,0 +1,115 @@
+import asyncio
+import dataclasses
+import json
+import sys
+import timeit
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, Optional
+from urllib.parse import urlparse
+
+from chkapi.api_reader import URL, APIReader
+from chkapi.exceptions import BadUrlException, HttpError
+
+BATCH_CONCURRENCY = 10
+BATCH_PER_HOST = 4
+BATCH_QUEUE_SIZE = 1000
+
+Result = Dict[str, Any]
+
+
+def read_urls(lines: Iterable[str]) -> Iterator[str]:
+    """
+    >>> list(read_urls(["http://a/\\n", "\\n", "# comment\\n", " http://b/ "]))
+    ['http://a/', 'http://b/']
+    """
+    for line in lines:
+        url = line.strip()
+        if url and not url.startswith("#"):
+            yield url
+
+
+async def check_url(reader: APIReader, url: str) -> Result:
+    result: Result = {"url": url, "ok": False, "status": None}
+    start = timeit.default_timer()
+    try:
+        response = await reader.read_url(URL(url))
+    except (BadUrlException, HttpError) as e:
+        result["status"] = getattr(e, "status_code", None)
+        result["error"] = str(e)
+    else:
+        result["ok"] = True
+        result["status"] = response.status_code
+        result["size"] = response.size
+        if response.timing:
+            result["timing"] = {
+                phase: round(seconds, 6) if seconds is not None else None
+                for phase, seconds in dataclasses.asdict(response.timing).items()
+            }
+    result["time"] = round(timeit.default_timer() - start, 6)
+    return result
+
+
+class HostLimits:
+    """Semaphores limiting requests sent to one host at the same time."""
+
+    def __init__(self, per_host: int) -> None:
+        self.per_host = per_host
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def __call__(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host)
+        return self._semaphores[host]
+
+
+async def run_batch(
+    reader: APIReader,
+    urls: Iterable[str],
+    on_result: Callable[[Result], None],
+    concurrency: int = BATCH_CONCURRENCY,
+    per_host: int = BATCH_PER_HOST,
+    queue_size: int = BATCH_QUEUE_SIZE,
+) -> bool:
+    """
+    Checks urls, at most `concurrency` at a time and `per_host` for one
+    host, and passes results in order they finish. Urls waiting for
+    a busy host don't take slots of other hosts. At most `queue_size`
+    urls are read ahead, in a worker thread, so the list can be of any
+    length and come from a slow pipe.
+    """
+    slots = asyncio.Semaphore(concurrency)
+    queued = asyncio.Semaphore(max(queue_size, concurrency))
+    host_limits = HostLimits(per_host)
+    pending = set()
+    all_ok = True
+
+    async def check(url: str):
+        nonlocal all_ok
+        try:
+            async with host_limits(url), slots:
+                result = await check_url(reader, url)
+            all_ok = all_ok and result["ok"]
+            on_result(result)
+        finally:
+            queued.release()
+
+    loop = asyncio.get_event_loop()
+    iterator = iter(urls)
+    while True:
+        await queued.acquire()
+        # Urls may come from a slow pipe, reading one must not stop checks.
+        url = await loop.run_in_executor(None, next, iterator, None)
+        if url is None:
+            break
+        task = asyncio.ensure_future(check(url))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+    return all_ok
+
+
+def write_result(result: Result, output: Optional[IO[str]] = None):
+    output = output or sys.stdout
+    output.write(json.dumps(result) + "\n")
+    output.flush()
@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import gettempdir
+from typing import List, Optional, Tuple
+
+INDEX_FILE_NAME = ".chkapi-index.db"
+MAX_INDEX_SIZE = 100 * 1024 * 1024
+MAX_INDEX_AGE = 30 * 24 * 60 * 60
+SEARCH_LIMIT = 20
+SNIPPET_SIZE = 60
+MIN_PHRASE_LENGTH = 3
+
+
+@dataclass(frozen=True)
+class BodyMatch:
+    url: str
+    offset: int
+    snippet: str
+
+
+def body_hash(body: str) -> bytes:
+    return hashlib.blake2b(body.encode(errors="replace"), digest_size=16).digest()
+
+
+def fts_phrase(phrase: str) -> str:
+    """
+    Quotes phrase, so FTS5 does not read it as a query.
+
+    >>> fts_phrase('say "hi" OR bye')
+    '"say ""hi"" OR bye"'
+    """
+    return '"' + phrase.replace('"', '""') + '"'
+
+
+class BodyIndex:
+    """
+    Full text index of fetched response bodies, kept in SQLite FTS5 with
+    trigram tokens, so any part of a body of at least three characters
+    can be found. Bounded by size and age, oldest bodies are dropped
+    first. All work is done in a single background thread, so the index
+    never blocks the event loop.
+    """
+
+    path: Path
+    max_size: int
+    max_age: float
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_size: int = MAX_INDEX_SIZE,
+        max_age: float = MAX_INDEX_AGE,
+    ) -> None:
+        self.path = path or Path(gettempdir()) / INDEX_FILE_NAME
+        self.max_size = max_size
+        self.max_age = max_age
+        self._connection: Optional[sqlite3.Connection] = None
+        self._trigram = True
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="chkapi-index")
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = self._connect()
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path, timeout=5, isolation_level=None, check_same_thread=False
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS bodies ("
+            "id INTEGER PRIMARY KEY, "
+            "url TEXT UNIQUE NOT NULL, "
+            "hash BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "indexed_at REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS bodies_indexed_at ON bodies (indexed_at)"
+        )
+        try:
+            connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS bodies_text "
+                "USING fts5(body, tokenize='trigram')"
+            )
+        except sqlite3.OperationalError:
+            # SQLite older than 3.34 has no trigram tokenizer, whole words
+            # can still be found.
+            self._trigram = False
+            connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS bodies_text USING fts5(body)"
+            )
+        return connection
+
+    async def add(self, url: str, body: str) -> bool:
+        """Indexes body of url, replacing the previous one. False if skipped."""
+        if not isinstance(body, str):
+            return False
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._add, url, body)
+
+    async def search(self, phrase: str, limit: int = SEARCH_LIMIT) -> List[BodyMatch]:
+        """Bodies containing phrase, ignoring case, most recent first."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._search, phrase, limit)
+
+    def _add(self, url: str, body: str) -> bool:
+        size = len(body)
+        if not size or size > self.max_size:
+            return False
+        digest = body_hash(body)
+        connection = self.connection
+        try:
+            row = connection.execute(
+                "SELECT id, hash FROM bodies WHERE url = ?", (url,)
+            ).fetchone()
+            now = time.time()
+            if row is not None and row[1] == digest:
+                connection.execute(
+                    "UPDATE bodies SET indexed_at = ? WHERE id = ?", (now, row[0])
+                )
+                return False
+            with connection:
+                connection.execute("BEGIN")
+                if row is not None:
+                    self._delete(connection, [row[0]])
+                rowid = connection.execute(
+                    "INSERT INTO bodies (url, hash, size, indexed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (url, digest, size, now),
+                ).lastrowid
+                connection.execute(
+                    "INSERT INTO bodies_text (rowid, body) VALUES (?, ?)",
+                    (rowid, body),
+                )
+                self._evict(connection, now)
+        except sqlite3.OperationalError:
+            # Database locked by another chkapi for too long, skip this body.
+            return False
+        return True
+
+    def _delete(self, connection: sqlite3.Connection, ids: List[int]):
+        connection.executemany("DELETE FROM bodies WHERE id = ?", [(i,) for i in ids])
+        connection.executemany(
+            "DELETE FROM bodies_text WHERE rowid = ?", [(i,) for i in ids]
+        )
+
+    def _evict(self, connection: sqlite3.Connection, now: float):
+        expired = [
+            row[0]
+            for row in connection.execute(
+                "SELECT id FROM bodies WHERE indexed_at < ?", (now - self.max_age,)
+            )
+        ]
+        self._delete(connection, expired)
+        (total,) = connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM bodies"
+        ).fetchone()
+        oldest = []
+        for rowid, size in connection.execute(
+            "SELECT id, size FROM bodies ORDER BY indexed_at"
+        ):
+            if total <= self.max_size:
+                break
+            oldest.append(rowid)
+            total -= size
+        self._delete(connection, oldest)
+
+    def _search(self, phrase: str, limit: int) -> List[BodyMatch]:
+        if len(phrase) < MIN_PHRASE_LENGTH and self._trigram:
+            return []
+        half = SNIPPET_SIZE // 2
+        query = (
+            "SELECT url, position - 1, "
+            "substr(body, max(position - ?, 1), ?) FROM ("
+            "SELECT b.url, b.indexed_at, t.body, "
+            "CASE WHEN instr(t.body, ?) > 0 THEN instr(t.body, ?) "
+            "ELSE instr(lower(t.body), lower(?)) END AS position "
+            "FROM bodies_text t JOIN bodies b ON b.id = t.rowid "
+            "WHERE bodies_text MATCH ? "
+            "ORDER BY b.indexed_at DESC LIMIT ?)"
+        )
+        args: Tuple = (half, SNIPPET_SIZE, phrase, phrase, phrase)
+        try:
+            rows = self.connection.execute(
+                query, args + (fts_phrase(phrase), limit)
+            ).fetchall()
+        except sqlite3.OperationalError:
+            return []
+        return [
+            BodyMatch(url, max(offset, 0), " ".join(snippet.split()))
+            for url, offset, snippet in rows
+        ]
+
+    def __len__(self) -> int:
+        (count,) = self.connection.execute("SELECT COUNT(*) FROM bodies").fetchone()
+        return count
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,311 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import gettempdir
+from typing import Dict, Optional, Set
+
+import httpx
+
+from chkapi.api_reader import (
+    URL,
+    APIReader,
+    CacheStatus,
+    ChunkCallback,
+    ProgressCallback,
+    Response,
+)
+from chkapi.exceptions import HttpError
+
+CACHE_FILE_NAME = ".chkapi-cache.db"
+MAX_CACHE_SIZE = 200 * 1024 * 1024
+MAX_MEMORY_CACHE_SIZE = 20 * 1024 * 1024
+
+
+def cache_control(headers: httpx.Headers) -> Dict[str, Optional[str]]:
+    """
+    >>> cache_control(httpx.Headers({"Cache-Control": "public, Max-Age=60"}))
+    {'public': None, 'max-age': '60'}
+    """
+    directives = {}
+    for directive in headers.get("cache-control", "").split(","):
+        name, _, value = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"') or None
+    return directives
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: str
+    headers: httpx.Headers
+    stored_at: float
+
+    @classmethod
+    def from_response(cls, url: str, response: Response) -> "CacheEntry":
+        return cls(url, response.body, httpx.Headers(response.headers), time.time())
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(k) + len(v) for k, v in self.headers.items())
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        """
+        >>> entry = CacheEntry("", "", httpx.Headers({"cache-control": "max-age=60"}), 0)
+        >>> entry.is_fresh(now=30), entry.is_fresh(now=90)
+        (True, False)
+        >>> CacheEntry("", "", httpx.Headers(), 0).is_fresh(now=0)
+        False
+        """
+        directives = cache_control(self.headers)
+        if "no-cache" in directives:
+            return False
+        try:
+            max_age = int(directives.get("max-age") or 0)
+        except ValueError:
+            return False
+        return (now or time.time()) - self.stored_at < max_age
+
+    def validators(self) -> Dict[str, str]:
+        """
+        >>> CacheEntry("", "", httpx.Headers({"etag": '"1"'}), 0).validators()
+        {'If-None-Match': '"1"'}
+        """
+        validators = {}
+        if "etag" in self.headers:
+            validators["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            validators["If-Modified-Since"] = self.headers["last-modified"]
+        return validators
+
+    def to_response(self, cache_status: CacheStatus) -> Response:
+        return Response(self.body, headers=self.headers, cache_status=cache_status)
+
+
+def is_cacheable(response: Response) -> bool:
+    return (
+        response.status_code == 200
+        and not response.truncated
+        and isinstance(response.body, str)
+        and "no-store" not in cache_control(httpx.Headers(response.headers))
+    )
+
+
+class ResponseCache:
+    """
+    Responses kept in SQLite and the most recently used ones also in
+    memory. Both are bounded by size, least recently used responses
+    are dropped first.
+    """
+
+    path: Path
+    max_size: int
+    max_memory_size: int
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        max_size: int = MAX_CACHE_SIZE,
+        max_memory_size: int = MAX_MEMORY_CACHE_SIZE,
+    ) -> None:
+        self.path = path or Path(gettempdir()) / CACHE_FILE_NAME
+        self.max_size = max_size
+        self.max_memory_size = max_memory_size
+        self._memory: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._memory_size = 0
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = self._connect()
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, "
+            "body TEXT NOT NULL, "
+            "headers TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        return connection
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        entry = self._memory.get(url)
+        if entry is None:
+            row = self.connection.execute(
+                "SELECT body, headers, stored_at FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            body, headers, stored_at = row
+            entry = CacheEntry(url, body, httpx.Headers(json.loads(headers)), stored_at)
+        self._remember(entry)
+        self.connection.execute(
+            "UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url)
+        )
+        return entry
+
+    def put(self, entry: CacheEntry) -> None:
+        if entry.size > self.max_size:
+            return
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(url, body, headers, stored_at, size, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                entry.url,
+                entry.body,
+                json.dumps(list(entry.headers.items())),
+                entry.stored_at,
+                entry.size,
+                time.time(),
+            ),
+        )
+        self._remember(entry)
+        self._evict()
+
+    def refresh(self, entry: CacheEntry, headers: httpx.Headers) -> CacheEntry:
+        """Updates an entry after the server said it is not modified."""
+        merged = httpx.Headers(entry.headers)
+        merged.update(headers)
+        entry = CacheEntry(entry.url, entry.body, merged, time.time())
+        self.connection.execute(
+            "UPDATE responses SET headers = ?, stored_at = ? WHERE url = ?",
+            (json.dumps(list(merged.items())), entry.stored_at, entry.url),
+        )
+        self._remember(entry)
+        return entry
+
+    def _remember(self, entry: CacheEntry):
+        previous = self._memory.pop(entry.url, None)
+        if previous is not None:
+            self._memory_size -= previous.size
+        if entry.size > self.max_memory_size:
+            return
+        self._memory[entry.url] = entry
+        self._memory_size += entry.size
+        while self._memory_size > self.max_memory_size:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_size -= dropped.size
+
+    def _evict(self):
+        total = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_size:
+            return
+        dropped = []
+        for url, size in self.connection.execute(
+            "SELECT url, size FROM responses ORDER BY last_used"
+        ):
+            dropped.append((url,))
+            total -= size
+            if total <= self.max_size:
+                break
+        self.connection.executemany("DELETE FROM responses WHERE url = ?", dropped)
+        for (url,) in dropped:
+            entry = self._memory.pop(url, None)
+            if entry is not None:
+                self._memory_size -= entry.size
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class CachingAPIReader:
+    """
+    Serves fresh responses from the cache and revalidates stale ones
+    with If-None-Match / If-Modified-Since. In offline mode cached
+    responses are returned right away and revalidated in background.
+    Requests sent with Cache-Control: no-store skip the cache.
+    """
+
+    reader: APIReader
+    cache: ResponseCache
+    offline: bool
+
+    def __init__(
+        self,
+        reader: APIReader,
+        cache: Optional[ResponseCache] = None,
+        offline: bool = False,
+    ) -> None:
+        self.reader = reader
+        self.cache = cache or ResponseCache()
+        self.offline = offline
+        self._revalidations: Set[asyncio.Task] = set()
+
+    async def read_url(
+        self,
+        url: URL,
+        on_progress: Optional[ProgressCallback] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        if "no-store" in cache_control(httpx.Headers(headers or {})):
+            return await self.reader.read_url(
+                url, on_progress=on_progress, on_chunk=on_chunk, headers=headers
+            )
+        entry = self.cache.get(url.url) if url else None
+        if entry is not None and self.offline:
+            self._revalidate_in_background(url, entry)
+            return entry.to_response(CacheStatus.HIT)
+        if entry is not None and entry.is_fresh():
+            return entry.to_response(CacheStatus.HIT)
+        return await self._fetch(url, entry, on_progress, on_chunk, headers)
+
+    async def _fetch(
+        self,
+        url: URL,
+        entry: Optional[CacheEntry],
+        on_progress: Optional[ProgressCallback] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Response:
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(entry.validators())
+        response = await self.reader.read_url(
+            url, on_progress=on_progress, on_chunk=on_chunk, headers=request_headers
+        )
+        if response.status_code == 304 and entry is not None:
+            entry = self.cache.refresh(entry, httpx.Headers(response.headers))
+            revalidated = entry.to_response(CacheStatus.REVALIDATED)
+            revalidated.timing = response.timing
+            return revalidated
+        if is_cacheable(response):
+            self.cache.put(CacheEntry.from_response(url.url, response))
+        response.cache_status = CacheStatus.MISS
+        return response
+
+    def _revalidate_in_background(self, url: URL, entry: CacheEntry):
+        task = asyncio.ensure_future(self._revalidate(url, entry))
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidations.discard)
+
+    async def _revalidate(self, url: URL, entry: CacheEntry):
+        try:
+            await self._fetch(url, entry)
+        except HttpError:
+            pass
+
+    async def close(self) -> None:
+        for task in list(self._revalidations):
+            task.cancel()
+        await self.reader.close()
+        self.cache.close()
@@ -0,0 +1,297 @@
+import argparse
+import sys
+from typing import List, Optional
+
+from chkapi import __version__
+from chkapi.api_reader import (
+    KEEPALIVE_EXPIRY,
+    MAX_BODY_SIZE,
+    MAX_CONNECTIONS,
+    MAX_KEEPALIVE_CONNECTIONS,
+    URL,
+    APIReader,
+    AsyncAPIReader,
+)
+from chkapi.exceptions import BadUrlException
+from chkapi.pagination import MAX_MERGED_SIZE, MAX_PAGES
+from chkapi.spool import SPOOL_SIZE
+
+LOAD_REQUESTS = 100
+LOAD_CONCURRENCY = 10
+DAY = 24 * 60 * 60
+
+
+def add_reader_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--max-connections", type=int, default=MAX_CONNECTIONS)
+    parser.add_argument("--max-keepalive", type=int, default=MAX_KEEPALIVE_CONNECTIONS)
+    parser.add_argument("--keepalive-expiry", type=float, default=KEEPALIVE_EXPIRY)
+    parser.add_argument("--http2", action="store_true")
+    parser.add_argument(
+        "--max-body-size",
+        type=int,
+        default=MAX_BODY_SIZE,
+        help="bytes kept from a response body, the rest is dropped",
+    )
+    parser.add_argument(
+        "--spool-size",
+        type=int,
+        default=SPOOL_SIZE,
+        help="bytes of a response body kept in memory, larger ones go to a temp file",
+    )
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    from chkapi.cache import MAX_CACHE_SIZE
+
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=MAX_CACHE_SIZE,
+        help="bytes of responses kept in the cache on disk",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="show cached responses at once and revalidate them in background",
+    )
+
+
+def add_index_arguments(parser: argparse.ArgumentParser):
+    from chkapi.body_index import MAX_INDEX_AGE, MAX_INDEX_SIZE
+
+    parser.add_argument(
+        "--index-size",
+        type=int,
+        default=MAX_INDEX_SIZE,
+        help="bytes of response bodies kept in the search index",
+    )
+    parser.add_argument(
+        "--index-age",
+        type=float,
+        default=MAX_INDEX_AGE / DAY,
+        help="days response bodies are kept in the search index",
+    )
+
+
+def add_load_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "-n", "--requests", type=int, default=LOAD_REQUESTS, help="load test size"
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=LOAD_CONCURRENCY,
+        help="requests sent at the same time in a load test",
+    )
+
+
+def add_prefetch_arguments(parser: argparse.ArgumentParser):
+    from chkapi.prefetch import PREFETCH_CONCURRENCY, PREFETCH_LINKS, PREFETCH_SIZE
+
+    parser.add_argument(
+        "--prefetch-links",
+        type=int,
+        default=PREFETCH_LINKS,
+        help="links of a response fetched before they are opened, 0 disables",
+    )
+    parser.add_argument(
+        "--prefetch-concurrency",
+        type=int,
+        default=PREFETCH_CONCURRENCY,
+        help="links prefetched at the same time",
+    )
+    parser.add_argument(
+        "--prefetch-size",
+        type=int,
+        default=PREFETCH_SIZE,
+        help="bytes of prefetched responses kept in memory",
+    )
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    from chkapi.profiler import PROFILE_FILE
+
+    parser = argparse.ArgumentParser(
+        prog="chkapi",
+        epilog="Run `chkapi load URL` for a load test and `chkapi batch [FILE]` "
+        "to check a list of urls, both without UI.",
+    )
+    parser.add_argument("url", nargs="?", default="")
+    parser.add_argument("--version", action="version", version=__version__)
+    add_reader_arguments(parser)
+    add_cache_arguments(parser)
+    add_load_arguments(parser)
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=MAX_PAGES,
+        help="pages merged when showing all pages",
+    )
+    parser.add_argument(
+        "--max-merged-size",
+        type=int,
+        default=MAX_MERGED_SIZE,
+        help="bytes of pages merged when showing all pages",
+    )
+    add_prefetch_arguments(parser)
+    add_index_arguments(parser)
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_FILE,
+        metavar="FILE",
+        help="write a trace of handlers, loads, formatting, search, rendering, "
+        "event loop lag and memory, to open in chrome://tracing or Perfetto",
+    )
+    return parser.parse_args(args)
+
+
+def parse_load_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="chkapi load", description="Send many requests to url in parallel."
+    )
+    parser.add_argument("url")
+    add_reader_arguments(parser)
+    add_load_arguments(parser)
+    return parser.parse_args(args)
+
+
+def parse_batch_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    from chkapi.batch import BATCH_CONCURRENCY, BATCH_PER_HOST
+
+    parser = argparse.ArgumentParser(
+        prog="chkapi batch",
+        description="Check urls from file or stdin, one per line, "
+        "and write a JSON line for every result.",
+    )
+    parser.add_argument(
+        "file", nargs="?", type=argparse.FileType("r"), default=sys.stdin
+    )
+    add_reader_arguments(parser)
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=BATCH_CONCURRENCY,
+        help="urls checked at the same time",
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=BATCH_PER_HOST,
+        help="urls of one host checked at the same time",
+    )
+    return parser.parse_args(args)
+
+
+def create_reader(args: argparse.Namespace) -> APIReader:
+    reader = AsyncAPIReader(
+        max_connections=max(args.max_connections, getattr(args, "concurrency", 0)),
+        max_keepalive_connections=args.max_keepalive,
+        keepalive_expiry=args.keepalive_expiry,
+        http2=args.http2,
+        max_body_size=args.max_body_size,
+        spool_size=args.spool_size,
+    )
+    if getattr(args, "no_cache", True):
+        return reader
+    from chkapi.cache import CachingAPIReader, ResponseCache
+
+    return CachingAPIReader(
+        reader, ResponseCache(max_size=args.cache_size), offline=args.offline
+    )
+
+
+async def load(args: argparse.Namespace) -> int:
+    from chkapi.load_test import format_ms, format_stats, run_load_test
+
+    def show_progress(stats):
+        sys.stderr.write(
+            f"\r{stats.completed}/{stats.requests} requests, "
+            f"{stats.throughput:.1f} req/s, "
+            f"p50 {format_ms(stats.histogram.percentile(50))}  "
+        )
+        sys.stderr.flush()
+
+    try:
+        url = URL(args.url)
+    except BadUrlException as e:
+        print(e, file=sys.stderr)
+        return 2
+    reader = create_reader(args)
+    try:
+        stats = await run_load_test(
+            reader,
+            url,
+            args.requests,
+            args.concurrency,
+            on_update=show_progress if sys.stderr.isatty() else None,
+        )
+    finally:
+        await reader.close()
+    if sys.stderr.isatty():
+        sys.stderr.write("\n")
+    print(format_stats(stats))
+    return 0
+
+
+async def batch(args: argparse.Namespace) -> int:
+    from chkapi.batch import read_urls, run_batch, write_result
+
+    reader = create_reader(args)
+    try:
+        all_ok = await run_batch(
+            reader,
+            read_urls(args.file),
+            write_result,
+            concurrency=args.concurrency,
+            per_host=args.per_host,
+        )
+    finally:
+        await reader.close()
+    return 0 if all_ok else 1
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--version"]:
+        print(__version__)
+        return
+    import asyncio
+
+    if argv[:1] == ["load"]:
+        sys.exit(asyncio.run(load(parse_load_args(argv[1:]))))
+    if argv[:1] == ["batch"]:
+        sys.exit(asyncio.run(batch(parse_batch_args(argv[1:]))))
+    args = parse_args(argv)
+    from chkapi.app import CheckApiApp
+    from chkapi.body_index import BodyIndex
+    from chkapi.profiler import profiler
+
+    if args.profile:
+        profiler.start()
+    try:
+        CheckApiApp.run(
+            args.url,
+            api_reader=create_reader(args),
+            load_requests=args.requests,
+            load_concurrency=args.concurrency,
+            max_pages=args.max_pages,
+            max_merged_size=args.max_merged_size,
+            prefetch_links=args.prefetch_links,
+            prefetch_concurrency=args.prefetch_concurrency,
+            prefetch_size=args.prefetch_size,
+            body_index=BodyIndex(
+                max_size=args.index_size, max_age=args.index_age * DAY
+            ),
+        )
+    finally:
+        if args.profile:
+            profiler.stop()
+            print(f"Profile written to {profiler.write(args.profile)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import hashlib
+import json
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+from rich.highlighter import Highlighter, JSONHighlighter, NullHighlighter
+from rich.text import Text
+
+from chkapi.spool import SpooledText
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_FORMAT_SIZE = 20 * 1024 * 1024
+MAX_STYLED_LINES = 1000
+MAX_DOCUMENT_CACHE_SIZE = 100 * 1024 * 1024
+WRAP_SIZE = 4096
+NEWLINE = ord("\n")
+
+
+def loads(body: str) -> Any:
+    """Parses JSON with orjson when it's installed, falls back to json."""
+    if orjson is not None:
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(body)
+
+
+def dumps(data: Any) -> str:
+    """
+    >>> print(dumps({"a": ["ż"]}))
+    {
+      "a": [
+        "ż"
+      ]
+    }
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+        except TypeError:
+            pass
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+
+class Document:
+    """
+    Response text split into lines. Only lines that are asked for
+    get highlighted, so the cost of rendering doesn't depend on
+    the size of the document.
+
+    >>> document = Document.from_body('{"a": [1, 2]}')
+    >>> len(document)
+    6
+    >>> [line.plain for line in document.render_lines(1, 3)]
+    ['  "a": [', '    1,']
+    >>> list(document.line_spans(5, 14))
+    [(1, 3, 8), (2, 0, 3)]
+    >>> document.line_at(5), document.offset_of_line(1)
+    (1, 2)
+    >>> Document.from_body("not json").plain
+    'not json'
+    >>> Document.from_body('{"a": 1}', max_size=5).plain
+    '{"a": 1}'
+
+    A spooled body is shown as it is, offsets are in bytes and lines
+    longer than `WRAP_SIZE` bytes are wrapped, so only a slice of the
+    file is read to show a line:
+
+    >>> document = Document(SpooledText.from_parts(["ż" * 3000, "\\n", "a"]))
+    >>> len(document), [len(document.line(n)) for n in range(len(document))]
+    (3, [2048, 952, 1])
+    >>> document.line_at(6001), list(document.line_spans(4094, 4100))
+    (2, [(0, 2047, 2048), (1, 0, 2)])
+    >>> document = Document(SpooledText.from_parts(["a" * WRAP_SIZE, "\\nb"]))
+    >>> [len(document.line(n)) for n in range(len(document))]
+    [4096, 1]
+    """
+
+    plain: Union[str, SpooledText]
+    line_starts: array
+    width: int
+    highlighter: Highlighter
+
+    def __init__(
+        self, plain: Union[str, SpooledText], highlighter: Optional[Highlighter] = None
+    ) -> None:
+        self.plain = plain
+        if isinstance(plain, SpooledText):
+            self.line_starts = self._index_spooled_lines(plain.buffer)
+        else:
+            self.line_starts = self._index_lines(plain)
+        self.width = max(
+            stop - start - 1
+            for start, stop in zip(self.line_starts, self.line_starts[1:])
+        )
+        self.highlighter = highlighter or NullHighlighter()
+        self._styled: "OrderedDict[int, Text]" = OrderedDict()
+
+    @staticmethod
+    def _index_lines(plain: str) -> array:
+        """Start offsets of every line, plus one past the end of the text."""
+        starts = array("q", [0])
+        find = plain.find
+        position = find("\n")
+        while position != -1:
+            starts.append(position + 1)
+            position = find("\n", position + 1)
+        starts.append(len(plain) + 1)
+        return starts
+
+    @staticmethod
+    def _index_spooled_lines(buffer) -> array:
+        """Like _index_lines, with long lines wrapped at a character boundary."""
+        starts = array("q", [0])
+        find = buffer.find
+        size = len(buffer)
+        start = 0
+        while start < size:
+            newline = find(b"\n", start, start + WRAP_SIZE)
+            if newline != -1:
+                start = newline + 1
+            elif start + WRAP_SIZE >= size:
+                break
+            else:
+                start += WRAP_SIZE
+                if buffer[start] == NEWLINE:
+                    start += 1
+                else:
+                    while buffer[start] & 0xC0 == 0x80:
+                        start -= 1
+            starts.append(start)
+        starts.append(size + 1)
+        return starts
+
+    @classmethod
+    def from_body(
+        cls, body: Union[str, SpooledText], max_size: int = MAX_FORMAT_SIZE
+    ) -> "Document":
+        """
+        Pretty printed JSON, or plain text when the body isn't JSON
+        or is larger than `max_size`. Takes long for large bodies,
+        so it's meant to run in a worker thread.
+        """
+        if isinstance(body, SpooledText) or len(body) > max_size:
+            return cls(body)
+        try:
+            data = loads(body)
+        except ValueError:
+            return cls(body)
+        return cls.from_data(data)
+
+    @classmethod
+    def from_data(cls, data: Any) -> "Document":
+        return cls(dumps(data), JSONHighlighter())
+
+    def __len__(self) -> int:
+        return len(self.line_starts) - 1
+
+    def line(self, lineno: int) -> str:
+        return self.plain[self.line_starts[lineno] : self._line_stop(lineno)]
+
+    def _line_stop(self, lineno: int) -> int:
+        """Offset of the newline ending a line, or of its end if it is wrapped."""
+        stop = self.line_starts[lineno + 1] - 1
+        if (
+            isinstance(self.plain, SpooledText)
+            and stop < len(self.plain)
+            and self.plain.buffer[stop] != NEWLINE
+        ):
+            return stop + 1
+        return stop
+
+    def _column(self, line_start: int, offset: int) -> int:
+        if isinstance(self.plain, SpooledText):
+            return len(self.plain[line_start:offset])
+        return offset - line_start
+
+    def line_at(self, offset: int) -> int:
+        return bisect_right(self.line_starts, offset) - 1
+
+    def offset_of_line(self, lineno: int) -> int:
+        return self.line_starts[min(lineno, len(self))]
+
+    @property
+    def size(self) -> int:
+        """
+        Approximate bytes of memory taken by text and line index,
+        without highlighted lines kept while it is shown.
+        """
+        return (
+            sys.getsizeof(self.plain)
+            + len(self.line_starts) * self.line_starts.itemsize
+        )
+
+    def render_lines(self, start: int, stop: int) -> List[Text]:
+        return [
+            self._styled_line(lineno) for lineno in range(start, min(stop, len(self)))
+        ]
+
+    def _styled_line(self, lineno: int) -> Text:
+        """Highlighted line, the most recently shown ones are kept."""
+        line = self._styled.get(lineno)
+        if line is None:
+            line = self._styled[lineno] = self.highlighter(self.line(lineno))
+            if len(self._styled) > MAX_STYLED_LINES:
+                self._styled.popitem(last=False)
+        else:
+            self._styled.move_to_end(lineno)
+        return line
+
+    def clear_styles(self):
+        """Drops highlighted lines, so a document kept in cache is not
+        larger than its `size`."""
+        self._styled.clear()
+
+    def line_spans(self, start: int, stop: int) -> Iterator[Tuple[int, int, int]]:
+        """Splits text offsets into (line, column start, column stop)."""
+        lineno = self.line_at(start)
+        while lineno < len(self) and self.line_starts[lineno] < stop:
+            line_start = self.line_starts[lineno]
+            yield (
+                lineno,
+                self._column(line_start, max(start, line_start)),
+                self._column(line_start, min(stop, self._line_stop(lineno))),
+            )
+            lineno += 1
+
+
+class DocumentCache:
+    """
+    Documents by hash of the response body, so showing the same
+    response again skips parsing and formatting. Least recently used
+    documents are dropped when all of them take more than `max_size`
+    bytes. Can be used from worker threads.
+
+    >>> cache = DocumentCache()
+    >>> first = cache.from_body('{"a": 1}')
+    >>> cache.from_body('{"a": 1}') is first, cache.from_body('{"a": 2}') is first
+    (True, False)
+    >>> len(cache)
+    2
+    """
+
+    max_size: int
+    size: int
+
+    def __init__(self, max_size: int = MAX_DOCUMENT_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self.size = 0
+        self._documents: "OrderedDict[bytes, Document]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    @staticmethod
+    def key(body: str) -> bytes:
+        return hashlib.blake2b(
+            body.encode("utf-8", "surrogatepass"), digest_size=16
+        ).digest()
+
+    def from_body(self, body: Union[str, SpooledText]) -> Document:
+        if isinstance(body, SpooledText):
+            # Cheap to show again and kept only while its response is.
+            return Document.from_body(body)
+        key = self.key(body)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+                return document
+        document = Document.from_body(body)
+        with self._lock:
+            if key not in self._documents and document.size <= self.max_size:
+                self._documents[key] = document
+                self.size += document.size
+                self._evict()
+        return document
+
+    def _evict(self):
+        while self.size > self.max_size:
+            _, document = self._documents.popitem(last=False)
+            self.size -= document.size
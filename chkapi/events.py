@@ -5,6 +5,8 @@ from textual import events
 from textual.events import InputEvent
 from textual.message import Message, MessageTarget
 
+from chkapi.search import SearchMode
+
 
 class UrlTyped(events.Event):
     pass
@@ -14,12 +16,19 @@ class Search(InputEvent):
 
     __slots__ = ["key"]
 
-    def __init__(self, sender: MessageTarget, value: Optional[str]) -> None:
+    def __init__(
+        self,
+        sender: MessageTarget,
+        value: Optional[str],
+        mode: SearchMode = SearchMode.LITERAL,
+    ) -> None:
         super().__init__(sender)
         self.value = value
+        self.mode = mode
 
     def __rich_repr__(self) -> rich.repr.Result:
         yield "value", self.value
+        yield "mode", self.mode
 
 
 class CancelSearch(Message):
@@ -30,6 +39,28 @@ class FinishSearch(Message):
     pass
 
 
+class SearchAll(Message):
+    def __init__(self, sender: MessageTarget, value: str) -> None:
+        super().__init__(sender)
+        self.value = value
+
+
+class SearchResultsChanged(Message):
+    def __init__(
+        self, sender: MessageTarget, selected: int, found: int, complete: bool
+    ) -> None:
+        super().__init__(sender)
+        self.selected = selected
+        self.found = found
+        self.complete = complete
+
+
+class FormattingChanged(Message):
+    def __init__(self, sender: MessageTarget, formatting: bool) -> None:
+        super().__init__(sender)
+        self.formatting = formatting
+
+
 class UrlChanged(Message, bubble=True):
     pass
 
@@ -42,3 +73,15 @@ class SetUrl(Message):
     def __init__(self, sender: MessageTarget, url: str) -> None:
         super().__init__(sender)
         self.url = url
+
+
+class LinkSelected(Message):
+    def __init__(self, sender: MessageTarget, url: str) -> None:
+        super().__init__(sender)
+        self.url = url
+
+
+class OpenLink(Message):
+    def __init__(self, sender: MessageTarget, url: str) -> None:
+        super().__init__(sender)
+        self.url = url
@@ -1,6 +1,21 @@
+from typing import Optional
+
+
 class HttpError(RuntimeError):
-    pass
+    status_code: Optional[int]
+
+    def __init__(self, message: str = "", status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
 
 
 class BadUrlException(RuntimeError):
     pass
+
+
+class SearchCancelled(RuntimeError):
+    pass
+
+
+class PaginationError(RuntimeError):
+    pass
@@ -0,0 +1,153 @@
+import json
+import re
+from typing import Any, List, Optional
+
+_STRUCTURE = re.compile(r'[\[\]{},"]')
+_STRING_END = re.compile(r'["\\]')
+
+MAX_BUFFER_SIZE = 1024 * 1024
+
+
+class IncrementalJSONParser:
+    r"""
+    Parses a JSON document fed in chunks and returns top level elements
+    as soon as they are complete. Array items are returned as values,
+    object members as (key, value) pairs.
+
+    >>> parser = IncrementalJSONParser()
+    >>> parser.feed('[{"a": 1}, {"b"')
+    [{'a': 1}]
+    >>> parser.feed(': "x]\\')
+    []
+    >>> parser.feed('""}, 3')
+    [{'b': 'x]"'}]
+    >>> parser.feed("]")
+    [3]
+    >>> parser.done
+    True
+    >>> parser = IncrementalJSONParser()
+    >>> parser.feed('{"a": {"b": [1]}, "c": {"d": null}')
+    [('a', {'b': [1]})]
+    >>> parser.feed("}")
+    [('c', {'d': None})]
+    >>> parser.container
+    '{'
+    >>> IncrementalJSONParser().feed("12")
+    []
+    >>> IncrementalJSONParser().feed("[1,")
+    [1]
+
+    Items of the first array in an object, like `{"data": [...]}`,
+    are returned one by one as (key, item) pairs, `member` is its key:
+
+    >>> parser = IncrementalJSONParser()
+    >>> parser.feed('{"count": 3, "data": [{"id": [1, 2]}, {"id"')
+    [('count', 3), ('data', {'id': [1, 2]})]
+    >>> parser.feed(': 2}], "meta": [], "x": 1}'), parser.member
+    ([('data', {'id': 2}), ('meta', []), ('x', 1)], 'data')
+
+    Parsing stops, as done, when `max_buffer` characters are waiting
+    for an element to complete:
+
+    >>> parser = IncrementalJSONParser(max_buffer=10)
+    >>> parser.feed('[{"name": "long'), parser.done
+    ([], True)
+    """
+
+    container: Optional[str] = None
+    member: Optional[str] = None
+    done: bool = False
+
+    def __init__(self, max_buffer: int = MAX_BUFFER_SIZE) -> None:
+        self.max_buffer = max_buffer
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._in_member = False
+
+    def feed(self, chunk: str) -> List[Any]:
+        if self.done:
+            return []
+        self._buffer += chunk
+        if self.container is None and not self._start():
+            return []
+        elements: List[Any] = []
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            if self._in_string:
+                match = _STRING_END.search(buffer, self._pos)
+                if match is None:
+                    self._pos = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        self._pos = match.start()
+                        break
+                    self._pos = match.end() + 1
+                    continue
+                self._in_string = False
+                self._pos = match.end()
+                continue
+            match = _STRUCTURE.search(buffer, self._pos)
+            if match is None:
+                self._pos = len(buffer)
+                break
+            char = match.group()
+            self._pos = match.end()
+            if char == '"':
+                self._in_string = True
+            elif char == "[" and self._depth == 0 and self._can_enter_member():
+                self.member = json.loads(
+                    "{" + buffer[: match.start()] + "0}"
+                ).popitem()[0]
+                self._in_member = True
+                buffer = buffer[match.end() :]
+                self._pos = 0
+            elif char in "[{":
+                self._depth += 1
+            elif self._depth > 0:
+                if char in "]}":
+                    self._depth -= 1
+            elif self._in_member:
+                text = buffer[: match.start()]
+                if text.strip():
+                    elements.append((self.member, json.loads(text)))
+                buffer = buffer[match.end() :]
+                self._pos = 0
+                if char != ",":
+                    self._in_member = False
+            else:
+                self._append_element(elements, buffer[: match.start()])
+                buffer = buffer[match.end() :]
+                self._pos = 0
+                if char != ",":
+                    self.done = True
+                    break
+        self._buffer = buffer
+        if len(buffer) > self.max_buffer:
+            self.done = True
+            self._buffer = ""
+        return elements
+
+    def _can_enter_member(self) -> bool:
+        return self.container == "{" and self.member is None
+
+    def _start(self) -> bool:
+        stripped = self._buffer.lstrip()
+        if not stripped:
+            return False
+        if stripped[0] not in "[{":
+            self.done = True
+            return False
+        self.container = stripped[0]
+        self._buffer = stripped[1:]
+        return True
+
+    def _append_element(self, elements: List[Any], text: str) -> None:
+        if not text.strip():
+            return
+        if self.container == "[":
+            elements.append(json.loads(text))
+        else:
+            elements.extend(json.loads("{" + text + "}").items())
@@ -0,0 +1,115 @@
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Match, Pattern, Union
+from urllib.parse import urljoin, urlparse
+
+from chkapi.search import SCAN_BLOCK_SIZE, never_cancelled
+from chkapi.spool import SpooledText
+
+MAX_LINKS = 10000
+MAX_LINK_SIZE = 8192
+LINK_KEYS = ("href", "url", "uri", "link", "self")
+
+_LINK = re.compile(
+    r'(?:"(?P<key>[^"\\]*)":\s*)?"(?P<url>https?://[^"\\\s]+|/[^"\\\s]*)"'
+)
+_BINARY_LINK = re.compile(_LINK.pattern.encode())
+
+
+@dataclass(frozen=True)
+class Link:
+    url: str
+    start: int
+    stop: int
+
+
+def is_link_key(key: str) -> bool:
+    """
+    >>> [is_link_key(key) for key in ("href", "avatar_url", "htmlUrl", "name")]
+    [True, True, True, False]
+    """
+    key = key.lower()
+    return key in LINK_KEYS or key.endswith(("_url", "url", "_href"))
+
+
+def same_origin(url: str, other: str) -> bool:
+    first, second = urlparse(url), urlparse(other)
+    return (first.scheme, first.netloc) == (second.scheme, second.netloc)
+
+
+def _scan(
+    pattern: Pattern, content, is_cancelled: Callable[[], bool]
+) -> Iterator[Match]:
+    """
+    Matches in blocks of content, so a scan can be stopped between them.
+    A block is extended by `MAX_LINK_SIZE` for matches starting in it.
+    """
+    position = 0
+    while position < len(content) and not is_cancelled():
+        stop = end = position + SCAN_BLOCK_SIZE
+        for match in pattern.finditer(content, position, stop + MAX_LINK_SIZE):
+            if match.start() >= stop:
+                break
+            end = max(end, match.end())
+            yield match
+        position = end
+
+
+def find_links(
+    text: Union[str, SpooledText],
+    base_url: str,
+    limit: int = MAX_LINKS,
+    is_cancelled: Callable[[], bool] = never_cancelled,
+) -> List[Link]:
+    """
+    Same origin urls in JSON text, with offsets of their strings.
+    Relative urls are taken only from link like keys. Stops early,
+    with links found so far, when is_cancelled returns True.
+
+    >>> text = '{"href": "/users/1", "home": "https://other.org/", "path": "/x",'
+    >>> text += ' "repos": "http://a/users/1/repos"}'
+    >>> [link.url for link in find_links(text, "http://a/users")]
+    ['http://a/users/1', 'http://a/users/1/repos']
+    >>> link = find_links(text, "http://a/users")[0]
+    >>> text[link.start : link.stop]
+    '/users/1'
+    >>> find_links(SpooledText.from_parts([text]), "http://a/users")[0] == link
+    True
+    >>> find_links(text, "http://a/users", is_cancelled=lambda: True)
+    []
+    """
+    links = []
+    if isinstance(text, SpooledText):
+        matches = _scan(_BINARY_LINK, text.buffer, is_cancelled)
+    else:
+        matches = _scan(_LINK, text, is_cancelled)
+    for match in matches:
+        url, key = match.group("url", "key")
+        if isinstance(url, bytes):
+            url = url.decode(errors="replace")
+            key = key.decode(errors="replace") if key else None
+        if url.startswith("/") and not is_link_key(key or ""):
+            continue
+        url = urljoin(base_url, url)
+        if url == base_url or not same_origin(url, base_url):
+            continue
+        links.append(Link(url, match.start("url"), match.end("url")))
+        if len(links) == limit:
+            break
+    return links
+
+
+def rank_links(links: Iterable[Link], start: int, stop: int) -> List[str]:
+    """
+    Distinct urls, those with strings between start and stop offsets
+    (on screen) first, then in order of the text.
+
+    >>> links = [Link("http://a/1", 0, 5), Link("http://a/2", 10, 15)]
+    >>> rank_links(links + [Link("http://a/1", 20, 25)], 8, 30)
+    ['http://a/2', 'http://a/1']
+    """
+    visible = []
+    rest = []
+    for link in links:
+        (visible if start <= link.start < stop else rest).append(link.url)
+    return list(dict.fromkeys(visible + rest))
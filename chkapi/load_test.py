@@ -0,0 +1,197 @@
+import asyncio
+import math
+import timeit
+from array import array
+from collections import Counter
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from chkapi.api_reader import URL, APIReader
+from chkapi.exceptions import HttpError
+
+MIN_LATENCY = 1e-6
+SUB_BUCKETS = 16
+POWERS = 32
+UPDATE_INTERVAL = 0.2
+NO_CACHE = {"Cache-Control": "no-store"}
+
+
+class LatencyHistogram:
+    """
+    Counts of latencies in logarithmic buckets, 16 for every power of
+    two, so percentiles are off by less than 5% and memory doesn't grow
+    with the number of samples.
+
+    >>> histogram = LatencyHistogram()
+    >>> for latency in [0.010] * 50 + [0.020] * 45 + [0.100] * 5:
+    ...     histogram.add(latency)
+    >>> len(histogram)
+    100
+    >>> [round(histogram.percentile(p), 3) for p in (50, 95, 99)]
+    [0.01, 0.02, 0.1]
+    >>> histogram.min, histogram.max
+    (0.01, 0.1)
+    """
+
+    counts: array
+    min: float
+    max: float
+    total: float
+
+    def __init__(self) -> None:
+        self.counts = array("Q", bytes(8 * SUB_BUCKETS * POWERS))
+        self.min = math.inf
+        self.max = 0.0
+        self.total = 0.0
+        self._count = 0
+
+    @staticmethod
+    def bucket(latency: float) -> int:
+        position = math.log2(max(latency, MIN_LATENCY) / MIN_LATENCY)
+        return min(int(position * SUB_BUCKETS), SUB_BUCKETS * POWERS - 1)
+
+    @staticmethod
+    def bucket_limit(bucket: int) -> float:
+        return MIN_LATENCY * 2 ** ((bucket + 1) / SUB_BUCKETS)
+
+    def add(self, latency: float):
+        self.counts[self.bucket(latency)] += 1
+        self._count += 1
+        self.total += latency
+        self.min = min(self.min, latency)
+        self.max = max(self.max, latency)
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def mean(self) -> float:
+        return self.total / self._count if self._count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        if not self._count:
+            return 0.0
+        rank = math.ceil(self._count * percent / 100)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(max(self.bucket_limit(bucket), self.min), self.max)
+        return self.max
+
+    def rows(self, number: int) -> Iterator[Tuple[float, int]]:
+        """Counts merged into at most `number` rows, with upper limits."""
+        used = [bucket for bucket, count in enumerate(self.counts) if count]
+        if not used:
+            return
+        first, last = used[0], used[-1]
+        size = math.ceil((last - first + 1) / number)
+        for start in range(first, last + 1, size):
+            stop = min(start + size, last + 1)
+            limit = min(self.bucket_limit(stop - 1), self.max)
+            yield limit, sum(self.counts[start:stop])
+
+
+class LoadTestStats:
+    requests: int
+    concurrency: int
+    histogram: LatencyHistogram
+    errors: Counter
+    started: float
+    finished: Optional[float]
+
+    def __init__(self, requests: int, concurrency: int) -> None:
+        self.requests = requests
+        self.concurrency = concurrency
+        self.histogram = LatencyHistogram()
+        self.errors = Counter()
+        self.started = timeit.default_timer()
+        self.finished = None
+
+    @property
+    def completed(self) -> int:
+        return len(self.histogram) + sum(self.errors.values())
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or timeit.default_timer()) - self.started
+
+    @property
+    def throughput(self) -> float:
+        return self.completed / self.elapsed if self.elapsed else 0.0
+
+
+async def run_load_test(
+    reader: APIReader,
+    url: URL,
+    requests: int,
+    concurrency: int,
+    on_update: Optional[Callable[[LoadTestStats], None]] = None,
+) -> LoadTestStats:
+    """Sends `requests` GETs, at most `concurrency` at a time."""
+    stats = LoadTestStats(requests, concurrency)
+    remaining = iter(range(requests))
+
+    async def worker():
+        for _ in remaining:
+            start = timeit.default_timer()
+            try:
+                await reader.read_url(url, headers=NO_CACHE)
+            except HttpError as e:
+                stats.errors[e.status_code or str(e)] += 1
+            else:
+                stats.histogram.add(timeit.default_timer() - start)
+
+    async def report():
+        while True:
+            await asyncio.sleep(UPDATE_INTERVAL)
+            on_update(stats)
+
+    reporter = asyncio.ensure_future(report()) if on_update else None
+    try:
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    finally:
+        stats.finished = timeit.default_timer()
+        if reporter:
+            reporter.cancel()
+    if on_update:
+        on_update(stats)
+    return stats
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f} ms"
+
+
+def format_stats(stats: LoadTestStats, rows: int = 10, width: int = 40) -> str:
+    """
+    >>> stats = LoadTestStats(requests=3, concurrency=2)
+    >>> stats.histogram.add(0.01)
+    >>> stats.errors[500] += 1
+    >>> stats.finished = stats.started + 2
+    >>> print(format_stats(stats, rows=2, width=4))
+    Requests 2 of 3, concurrency 2, 1.0 req/s
+    Latency p50 10.0 ms, p95 10.0 ms, p99 10.0 ms, max 10.0 ms
+    Errors 500: 1
+    <BLANKLINE>
+       10.0 ms ████ 1
+    """
+    histogram = stats.histogram
+    lines = [
+        f"Requests {stats.completed} of {stats.requests}, "
+        f"concurrency {stats.concurrency}, {stats.throughput:.1f} req/s",
+        "Latency "
+        + ", ".join(f"p{p} {format_ms(histogram.percentile(p))}" for p in (50, 95, 99))
+        + f", max {format_ms(histogram.max)}",
+    ]
+    if stats.errors:
+        lines.append(
+            "Errors "
+            + ", ".join(f"{error}: {count}" for error, count in stats.errors.items())
+        )
+    lines.append("")
+    histogram_rows: List[Tuple[float, int]] = list(histogram.rows(rows))
+    top = max((count for _, count in histogram_rows), default=0)
+    for limit, count in histogram_rows:
+        bar = "█" * math.ceil(width * count / top) if count else ""
+        lines.append(f"{format_ms(limit):>10} {bar} {count}")
+    return "\n".join(lines)
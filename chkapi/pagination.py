@@ -0,0 +1,176 @@
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Union
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+from chkapi.api_reader import Response
+from chkapi.exceptions import PaginationError
+from chkapi.spool import SpooledText
+
+MAX_PAGES = 20
+MAX_MERGED_SIZE = 50 * 1024 * 1024
+MAX_PAGE_SIZE = 10 * 1024 * 1024
+
+NEXT_FIELDS = ("next", "next_page", "nextPage", "next_url", "nextUrl", "next_href")
+CURSOR_FIELDS = {
+    "next_cursor": "cursor",
+    "nextCursor": "cursor",
+    "cursor": "cursor",
+    "next_page_token": "page_token",
+    "nextPageToken": "pageToken",
+}
+LINK_CONTAINERS = ("links", "_links", "paging", "pagination", "meta")
+ITEM_FIELDS = ("data", "items", "results", "records", "entries", "values")
+
+_LINK = re.compile(r"<([^>]*)>\s*((?:;[^,<]*)*)")
+_REL_NEXT = re.compile(r';\s*rel\s*=\s*"?(?:[^";]*\s)?next[\s";]', re.IGNORECASE)
+
+
+def parse_json(body: Union[str, SpooledText]) -> Any:
+    if isinstance(body, SpooledText) or len(body) > MAX_PAGE_SIZE:
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def page_data(url: str, body: Union[str, SpooledText]) -> Any:
+    """
+    Parsed body of a page to merge, PaginationError tells why it can't be.
+
+    >>> page_data("http://a/", '{"items": []}')
+    {'items': []}
+    >>> page_data("http://a/?page=2", "<html>")
+    Traceback (most recent call last):
+    ...
+    chkapi.exceptions.PaginationError: Page http://a/?page=2 is not JSON
+    """
+    if isinstance(body, SpooledText) or len(body) > MAX_PAGE_SIZE:
+        raise PaginationError(f"Page {url} is too large to merge")
+    data = parse_json(body)
+    if data is None:
+        raise PaginationError(f"Page {url} is not JSON")
+    return data
+
+
+def link_header_next(link: str) -> Optional[str]:
+    """
+    >>> link_header_next('<http://a/?p=1>; rel="prev", <http://a/?p=3>; rel="next"')
+    'http://a/?p=3'
+    >>> link_header_next('<http://a/?p=1>; rel="first last"')
+    """
+    for match in _LINK.finditer(link):
+        if _REL_NEXT.search(match.group(2) + ";"):
+            return match.group(1)
+    return None
+
+
+def with_query(url: str, name: str, value: str) -> str:
+    """
+    >>> with_query("http://a/items?cursor=1&limit=5", "cursor", "2")
+    'http://a/items?cursor=2&limit=5'
+    """
+    parts = urlparse(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query[name] = value
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def body_next(url: str, data: Any) -> Optional[str]:
+    """
+    >>> body_next("http://a/items", {"items": [], "next": "/items?page=2"})
+    'http://a/items?page=2'
+    >>> body_next("http://a/items", {"_links": {"next": {"href": "?page=2"}}})
+    'http://a/items?page=2'
+    >>> body_next("http://a/items?limit=5", {"meta": {"next_cursor": "abc"}})
+    'http://a/items?limit=5&cursor=abc'
+    >>> body_next("http://a/items", {"next": None})
+    """
+    if not isinstance(data, dict):
+        return None
+    containers = [data] + [
+        data[name] for name in LINK_CONTAINERS if isinstance(data.get(name), dict)
+    ]
+    for container in containers:
+        for field in NEXT_FIELDS:
+            value = container.get(field)
+            if isinstance(value, dict):
+                value = value.get("href")
+            if isinstance(value, str) and value:
+                return urljoin(url, value)
+        for field, parameter in CURSOR_FIELDS.items():
+            value = container.get(field)
+            if isinstance(value, (str, int)) and not isinstance(value, bool) and value:
+                return with_query(url, parameter, str(value))
+    return None
+
+
+def next_page_url(url: str, response: Response, data: Any = None) -> Optional[str]:
+    """Next page from Link header, or from fields of a parsed body."""
+    next_url = None
+    if "link" in response.headers:
+        next_url = link_header_next(response.headers["link"])
+        next_url = urljoin(url, next_url) if next_url else None
+    if next_url is None:
+        next_url = body_next(url, data)
+    return next_url if next_url != url else None
+
+
+def page_items(data: Any) -> List[Any]:
+    """
+    >>> page_items([1, 2])
+    [1, 2]
+    >>> page_items({"count": 2, "results": [1, 2]})
+    [1, 2]
+    >>> page_items({"a": 1})
+    [{'a': 1}]
+    """
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for field in ITEM_FIELDS:
+            if isinstance(data.get(field), list):
+                return data[field]
+        for value in data.values():
+            if isinstance(value, list):
+                return value
+    return [data]
+
+
+@dataclass
+class Page:
+    url: str
+    response: Response
+    items: List[Any]
+    next_url: Optional[str]
+
+
+async def follow_pages(
+    read: Callable[[str], Awaitable[Response]],
+    url: str,
+    response: Response,
+    max_pages: int = MAX_PAGES,
+    max_size: int = MAX_MERGED_SIZE,
+) -> AsyncIterator[Page]:
+    """
+    Pages starting from an already read one, until there is no next
+    page, `max_pages` were read or their bodies exceed `max_size`.
+    Raises PaginationError at a page that can't be merged.
+    """
+    import asyncio
+
+    loop = asyncio.get_event_loop()
+    size = 0
+    pages = 0
+    while True:
+        data = await loop.run_in_executor(None, page_data, url, response.body)
+        next_url = next_page_url(url, response, data)
+        yield Page(url, response, page_items(data), next_url)
+        pages += 1
+        size += len(response.body)
+        if next_url is None or pages >= max_pages or size >= max_size:
+            return
+        url = next_url
+        response = await read(url)
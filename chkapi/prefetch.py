@@ -0,0 +1,93 @@
+import asyncio
+from collections import OrderedDict
+from typing import Optional
+
+from chkapi.api_reader import URL, APIReader, Progress, Response
+from chkapi.exceptions import BadUrlException, HttpError
+
+PREFETCH_LINKS = 5
+PREFETCH_CONCURRENCY = 2
+PREFETCH_ENTRIES = 20
+PREFETCH_SIZE = 20 * 1024 * 1024
+
+
+class Prefetcher:
+    """
+    Responses fetched before they are asked for, so following a link
+    doesn't wait for network. Oldest responses are dropped when there
+    are more than `max_entries` or they take more than `max_size`.
+    A response larger than `max_size` is abandoned while downloading.
+    """
+
+    reader: APIReader
+    max_concurrency: int
+    max_entries: int
+    max_size: int
+
+    def __init__(
+        self,
+        reader: APIReader,
+        max_concurrency: int = PREFETCH_CONCURRENCY,
+        max_entries: int = PREFETCH_ENTRIES,
+        max_size: int = PREFETCH_SIZE,
+    ) -> None:
+        self.reader = reader
+        self.max_concurrency = max_concurrency
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self._responses: "OrderedDict[str, asyncio.Future]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def prefetch(self, url: str):
+        if url in self._responses:
+            self._responses.move_to_end(url)
+            return
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        future = asyncio.ensure_future(self._fetch(url))
+        future.add_done_callback(lambda _: self._evict())
+        self._responses[url] = future
+        self._evict()
+
+    async def _fetch(self, url: str) -> Optional[Response]:
+        async with self._slots:
+            try:
+                return await self.reader.read_url(
+                    URL(url), on_progress=self._check_size
+                )
+            except (HttpError, BadUrlException):
+                return None
+
+    def _check_size(self, progress: Progress):
+        if progress.received > self.max_size:
+            raise HttpError("Response too large to prefetch")
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._responses
+
+    async def take(self, url: str) -> Optional[Response]:
+        """Prefetched response, None if url wasn't prefetched or failed."""
+        future = self._responses.pop(url, None)
+        if future is None:
+            return None
+        return await future
+
+    @property
+    def size(self) -> int:
+        return sum(
+            len(future.result().body)
+            for future in self._responses.values()
+            if future.done() and not future.cancelled() and future.result()
+        )
+
+    def _evict(self):
+        while self._responses and (
+            len(self._responses) > self.max_entries or self.size > self.max_size
+        ):
+            _, future = self._responses.popitem(last=False)
+            future.cancel()
+
+    def cancel(self):
+        for future in self._responses.values():
+            future.cancel()
+        self._responses.clear()
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import threading
+import timeit
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+PROFILE_FILE = "chkapi-profile.json"
+LAG_INTERVAL = 0.05
+
+LANES = ("handler", "load", "format", "search", "render", "loop")
+
+
+class Profiler:
+    """
+    Records spans and counters as Chrome trace events, which can be
+    opened in chrome://tracing or https://ui.perfetto.dev. Does nothing
+    until started, so spans can stay in code.
+
+    >>> profiler = Profiler()
+    >>> with profiler.span("handle_url_changed"):
+    ...     pass
+    >>> profiler.events
+    []
+    >>> profiler.start(trace_memory=False)
+    >>> with profiler.span("handle_url_changed", url="http://a/"):
+    ...     pass
+    >>> profiler.counter("loop lag", ms=1.5)
+    >>> [(e["name"], e["ph"]) for e in profiler.events if e["ph"] != "M"]
+    [('handle_url_changed', 'X'), ('loop lag', 'C')]
+    """
+
+    enabled: bool
+    events: List[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.events = []
+        self._start = 0.0
+        self._lock = threading.Lock()
+
+    def start(self, trace_memory: bool = True):
+        self.enabled = True
+        self.events = []
+        self._start = timeit.default_timer()
+        for tid, lane in enumerate(LANES, 1):
+            self._add(ph="M", name="thread_name", tid=tid, args={"name": lane})
+        if trace_memory:
+            tracemalloc.start()
+
+    def stop(self):
+        self.enabled = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def _now(self) -> float:
+        """Microseconds since start."""
+        return (timeit.default_timer() - self._start) * 1_000_000
+
+    def _add(self, **event):
+        event.setdefault("pid", 1)
+        with self._lock:
+            self.events.append(event)
+
+    @contextmanager
+    def span(self, name: str, lane: str = "handler", **args) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = self._now()
+        try:
+            yield
+        finally:
+            self._add(
+                ph="X",
+                name=name,
+                cat=lane,
+                ts=start,
+                dur=self._now() - start,
+                tid=LANES.index(lane) + 1,
+                args=args,
+            )
+
+    def counter(self, name: str, **values: float):
+        if self.enabled:
+            self._add(ph="C", name=name, ts=self._now(), tid=1, args=values)
+
+    @contextmanager
+    def load(self, url: str) -> Iterator[None]:
+        """Span of loading url, with peak of memory allocated meanwhile."""
+        if not self.enabled:
+            yield
+            return
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        with self.span("load", "load", url=url):
+            yield
+        if tracemalloc.is_tracing():
+            self.counter(
+                "allocation peak", mb=tracemalloc.get_traced_memory()[1] / 2**20
+            )
+
+    async def watch_loop(self, interval: float = LAG_INTERVAL):
+        """Samples how late the event loop wakes up a sleeping task."""
+        while True:
+            start = timeit.default_timer()
+            await asyncio.sleep(interval)
+            lag = timeit.default_timer() - start - interval
+            self.counter("loop lag", ms=max(lag, 0.0) * 1000)
+
+    def write(self, path: Optional[Path] = None) -> Path:
+        path = Path(path or PROFILE_FILE)
+        with self._lock:
+            trace = {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+        path.write_text(json.dumps(trace))
+        return path
+
+
+profiler = Profiler()
@@ -1,11 +1,82 @@
 import re
+import threading
+from bisect import bisect_left
 from collections import namedtuple
-from typing import List, Optional
+from enum import Enum
+from functools import lru_cache
+from typing import Callable, Iterator, List, Optional, Pattern, Union
+
+from chkapi.exceptions import SearchCancelled
+from chkapi.spool import SpooledText
 
 Occurrence = namedtuple("Occurrence", "start stop")
 
+SCAN_BLOCK_SIZE = 1024 * 1024
+CONSUME_BATCH_SIZE = 1000
+
+
+class SearchMode(Enum):
+    LITERAL = "literal"
+    IGNORE_CASE = "ignore case"
+    REGEX = "regex"
+
+    def next(self) -> "SearchMode":
+        """
+        >>> SearchMode.LITERAL.next()
+        <SearchMode.IGNORE_CASE: 'ignore case'>
+        >>> SearchMode.REGEX.next()
+        <SearchMode.LITERAL: 'literal'>
+        """
+        modes = list(SearchMode)
+        return modes[(modes.index(self) + 1) % len(modes)]
+
+
+@lru_cache(maxsize=64)
+def compile_pattern(value: str, mode: SearchMode, binary: bool = False) -> Pattern:
+    """
+    Binary patterns search UTF-8 bytes, where ignoring case and
+    regex classes like \\w cover only ASCII.
+
+    >>> compile_pattern("a.b", SearchMode.LITERAL).pattern
+    'a\\\\.b'
+    >>> compile_pattern("a.b", SearchMode.LITERAL) is compile_pattern(
+    ...     "a.b", SearchMode.LITERAL
+    ... )
+    True
+    >>> compile_pattern("ż.", SearchMode.REGEX, binary=True).pattern
+    b'\\xc5\\xbc.'
+    """
+    pattern = value.encode() if binary else value
+    if mode is SearchMode.REGEX:
+        return re.compile(pattern)
+    if mode is SearchMode.IGNORE_CASE:
+        return re.compile(re.escape(pattern), re.IGNORECASE)
+    return re.compile(re.escape(pattern))
+
+
+def can_overlap(value: str, mode: SearchMode) -> bool:
+    """
+    True if two matches of value can overlap, because its beginning
+    is also its end.
+
+    >>> can_overlap("ana", SearchMode.LITERAL), can_overlap("an", SearchMode.LITERAL)
+    (True, False)
+    >>> can_overlap("Aba", SearchMode.IGNORE_CASE)
+    True
+    """
+    if mode is SearchMode.IGNORE_CASE:
+        value = value.lower()
+    return any(value[:size] == value[-size:] for size in range(1, len(value)))
+
+
+def never_cancelled() -> bool:
+    return False
+
 
 class EmptySearchResults:
+    complete = True
+    selected_index = 0
+
     def select_next(self) -> Optional[Occurrence]:
         return None
 
@@ -15,6 +86,15 @@ class EmptySearchResults:
     def selected(self) -> Optional[Occurrence]:
         return None
 
+    def between(self, start: int, stop: int) -> List[Occurrence]:
+        return []
+
+    def can_narrow(self, value: str, mode: SearchMode) -> bool:
+        return False
+
+    def consume_all(self, is_cancelled: Callable[[], bool] = never_cancelled):
+        pass
+
     def __len__(self) -> int:
         return 0
 
@@ -24,7 +104,15 @@ class EmptySearchResults:
 
 class SearchResults:
     """
+    Matches are found lazily, the first one when it is asked for
+    and the rest by consume_all.
+
     >>> result = SearchResults("Ala", "Ala ma kota. Ala nie ma psa")
+    >>> result.selected()
+    Occurrence(start=0, stop=3)
+    >>> len(result)
+    1
+    >>> result.consume_all()
     >>> len(result) == 2
     True
     >>> result.all()
@@ -39,40 +127,210 @@ class SearchResults:
     Occurrence(start=0, stop=3)
     >>> result.selected()
     Occurrence(start=0, stop=3)
+    >>> result.between(3, 20)
+    [Occurrence(start=13, stop=16)]
     >>> result = SearchResults("Lump", "Ala ma kota")
+    >>> result.consume_all()
     >>> len(result) == 0
     True
     >>> result.selected()
     >>> result.select_next()
+
+    Queries are literal unless another mode is chosen:
+
+    >>> result = SearchResults("a.", "a. ab A.", mode=SearchMode.LITERAL)
+    >>> result.consume_all()
+    >>> result.all()
+    [Occurrence(start=0, stop=2)]
+    >>> result = SearchResults("a.", "a. ab A.", mode=SearchMode.IGNORE_CASE)
+    >>> result.consume_all()
+    >>> result.all()
+    [Occurrence(start=0, stop=2), Occurrence(start=6, stop=8)]
+    >>> result = SearchResults("a.", "a. ab A.", mode=SearchMode.REGEX)
+    >>> result.consume_all()
+    >>> result.all()
+    [Occurrence(start=0, stop=2), Occurrence(start=3, stop=5)]
+
+    A query extending the previous one narrows its results
+    instead of scanning the content again:
+
+    >>> result = SearchResults("a", "banana")
+    >>> result.consume_all()
+    >>> narrowed = SearchResults("an", "banana", previous=result)
+    >>> narrowed.consume_all()
+    >>> narrowed.all()
+    [Occurrence(start=1, stop=3), Occurrence(start=3, stop=5)]
+    >>> narrowed = SearchResults("ana", "banana", previous=result)
+    >>> narrowed.consume_all()
+    >>> narrowed.all()
+    [Occurrence(start=1, stop=4)]
+
+    unless matches of the previous query could overlap, then
+    some of them were skipped and the content is scanned again:
+
+    >>> result = SearchResults("aa", "aaab")
+    >>> result.consume_all()
+    >>> result.can_narrow("aab", SearchMode.LITERAL)
+    False
+    >>> narrowed = SearchResults("aab", "aaab", previous=result)
+    >>> narrowed.consume_all()
+    >>> narrowed.all()
+    [Occurrence(start=1, stop=4)]
+    >>> SearchResults("a", "banana").consume_all(is_cancelled=lambda: True)
+    Traceback (most recent call last):
+    ...
+    chkapi.exceptions.SearchCancelled
+
+    Selecting does not wait for a scan running in another thread:
+
+    >>> result = SearchResults("b", "ab")
+    >>> with result._lock:
+    ...     result.selected()
+    >>> result.selected()
+    Occurrence(start=1, stop=2)
+
+    Spooled content is searched in place, offsets are in bytes:
+
+    >>> result = SearchResults("ma", SpooledText.from_parts(["Żaba ma"]))
+    >>> result.consume_all()
+    >>> result.all()
+    [Occurrence(start=6, stop=8)]
     """
 
-    def __init__(self, value: str, content: str):
+    complete: bool
+    cancelled: bool
+
+    def __init__(
+        self,
+        value: str,
+        content: Union[str, SpooledText],
+        mode: SearchMode = SearchMode.LITERAL,
+        previous: Optional["SearchResults"] = None,
+    ):
         self._selected: int = 0
         self._i: int = 0
-        self._result: List[Occurrence] = [
-            Occurrence(*res.span()) for res in re.finditer(value, content)
-        ]
+        self._result: List[Occurrence] = []
+        self._starts: List[int] = []
+        self._lock = threading.Lock()
+        self._is_cancelled: Callable[[], bool] = never_cancelled
         self.value: str = value
+        self.mode: SearchMode = mode
+        self.complete = False
+        self.cancelled = False
+        if isinstance(content, SpooledText):
+            pattern = compile_pattern(value, mode, binary=True)
+            content = content.buffer
+        else:
+            pattern = compile_pattern(value, mode)
+        if previous is not None and previous.can_narrow(value, mode):
+            self._matches = previous._narrow(pattern, content)
+        else:
+            self._matches = self._scan(pattern, content)
+
+    def can_narrow(self, value: str, mode: SearchMode) -> bool:
+        return (
+            self.complete
+            and mode is self.mode
+            and mode is not SearchMode.REGEX
+            and value.startswith(self.value)
+            and not can_overlap(self.value, self.mode)
+        )
+
+    def _scan(self, pattern: Pattern, content) -> Iterator[Occurrence]:
+        newline = "\n" if isinstance(content, str) else b"\n"
+        position = 0
+        while position < len(content):
+            if self._is_cancelled():
+                raise SearchCancelled()
+            stop = content.find(newline, position + SCAN_BLOCK_SIZE)
+            stop = len(content) if stop == -1 else stop
+            for res in pattern.finditer(content, position, stop):
+                yield Occurrence(*res.span())
+            position = stop
+
+    def _narrow(self, pattern: Pattern, content) -> Iterator[Occurrence]:
+        last_stop = 0
+        for occurrence in self._result:
+            if occurrence.start < last_stop:
+                continue
+            res = pattern.match(content, occurrence.start)
+            if res:
+                last_stop = res.end()
+                yield Occurrence(*res.span())
+
+    def consume(
+        self,
+        limit: int,
+        is_cancelled: Callable[[], bool] = never_cancelled,
+        blocking: bool = True,
+    ) -> int:
+        """
+        Finds up to limit more matches, each one visible as soon as it is
+        found. Without blocking returns 0 at once when another thread
+        is scanning.
+        """
+        if not self._lock.acquire(blocking):
+            return 0
+        found = 0
+        try:
+            if self.complete or self.cancelled:
+                return 0
+            self._is_cancelled = is_cancelled
+            for occurrence in self._matches:
+                if self.complete:
+                    # Cleared while scanning in another thread.
+                    return found
+                self._result.append(occurrence)
+                self._starts.append(occurrence.start)
+                found += 1
+                if found == limit:
+                    return found
+            self.complete = True
+        except SearchCancelled:
+            self.cancelled = True
+            raise
+        finally:
+            self._lock.release()
+        return found
+
+    def consume_all(self, is_cancelled: Callable[[], bool] = never_cancelled):
+        while not self.complete and not self.cancelled:
+            if is_cancelled():
+                raise SearchCancelled()
+            self.consume(CONSUME_BATCH_SIZE, is_cancelled)
 
     def select_next(self) -> Optional[Occurrence]:
         if len(self) == 0:
             return
-        if self._selected < len(self._result) - 1:
+        if self._selected < len(self._result) - 1 or self.consume(1, blocking=False):
             self._selected += 1
-        else:
+        elif self.complete or self.cancelled:
             self._selected = 0
         return self._result[self._selected]
 
     def all(self) -> List[Occurrence]:
         return self._result
 
+    @property
+    def selected_index(self) -> int:
+        return self._selected
+
     def selected(self) -> Optional[Occurrence]:
-        if len(self) == 0:
+        if len(self) == 0 and not self.consume(1, blocking=False):
             return
         return self._result[self._selected]
 
+    def between(self, start: int, stop: int) -> List[Occurrence]:
+        first = bisect_left(self._starts, start)
+        if first > 0 and self._result[first - 1].stop > start:
+            first -= 1
+        last = bisect_left(self._starts, stop, lo=first)
+        return self._result[first:last]
+
     def __len__(self) -> int:
         return len(self._result)
 
     def clear(self):
         self._result = []
+        self._starts = []
+        self.complete = True
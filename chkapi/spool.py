@@ -0,0 +1,66 @@
+import mmap
+import tempfile
+from typing import BinaryIO, Iterable, Optional
+
+SPOOL_SIZE = 20 * 1024 * 1024
+
+
+class SpooledText:
+    """
+    UTF-8 text in a temporary file mapped to memory, so a large body
+    is paged in by the system as parts of it are read instead of
+    being held in a str. Offsets and length are in bytes, slices are
+    decoded to str. The file is removed when the text is closed or
+    garbage collected.
+
+    >>> text = SpooledText.from_parts(['{"name": ', '"Zażółć"}'])
+    >>> len(text), text[9:21], text.find('"', 2)
+    (22, '"Zażółć"', 6)
+    >>> text[-1:]
+    '}'
+    >>> text.close()
+    """
+
+    buffer: mmap.mmap
+
+    def __init__(self, file: BinaryIO) -> None:
+        file.flush()
+        self._file = file
+        self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def from_parts(cls, parts: Iterable[str]) -> "SpooledText":
+        spooler = Spooler()
+        for part in parts:
+            spooler.write(part)
+        return spooler.finish()
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def __getitem__(self, index: slice) -> str:
+        return self.buffer[index].decode("utf-8", "replace")
+
+    def find(self, sub: str, start: int = 0, end: Optional[int] = None) -> int:
+        end = len(self.buffer) if end is None else end
+        return self.buffer.find(sub.encode(), start, end)
+
+    def close(self):
+        self.buffer.close()
+        self._file.close()
+
+
+class Spooler:
+    """Writes text to a temporary file in parts, as it is received."""
+
+    def __init__(self) -> None:
+        self._file = tempfile.TemporaryFile()
+        self.size = 0
+
+    def write(self, text: str):
+        data = text.encode("utf-8", "surrogatepass")
+        self._file.write(data)
+        self.size += len(data)
+
+    def finish(self) -> SpooledText:
+        return SpooledText(self._file)
@@ -1,17 +1,31 @@
+import asyncio
 import collections
+import heapq
 import os
+import sqlite3
+import time
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
 from pathlib import Path
 from tempfile import gettempdir
-from typing import Protocol
+from typing import Callable, Dict, Iterable, List, Optional, Protocol, Tuple
 
 STORAGE_FILE_NAME = ".chkapi"
+DATABASE_FILE_NAME = ".chkapi.db"
+AUTOCOMPLETE_LIMIT = 10
+MAX_RANKED_CANDIDATES = 5000
+MAX_CHAR = chr(0x10FFFF)
+
+DAY = 24 * 60 * 60
+RECENCY_WEIGHTS = ((4 * DAY, 100), (14 * DAY, 70), (31 * DAY, 50), (90 * DAY, 30))
+OLD_WEIGHT = 10
 
 
 class Storage(Protocol):
     async def save(self, url: str):
         ...
 
-    async def find(self, phrase: str):
+    async def find(self, phrase: str, limit: int = AUTOCOMPLETE_LIMIT):
         ...
 
 
@@ -22,10 +36,10 @@ class TempFileStorage:
         lines.add(url)
         self._write_lines(tmpdir, lines)
 
-    async def find(self, phrase: str) -> list[str]:
+    async def find(self, phrase: str, limit: int = AUTOCOMPLETE_LIMIT) -> list[str]:
         tmpdir = Path(gettempdir())
         lines = self._load_existing_lines(tmpdir)
-        return [line.strip() for line in lines if phrase in line]
+        return [line.strip() for line in lines if phrase in line][:limit]
 
     def _write_lines(self, tmpdir, lines: collections.Collection):
         with open(tmpdir / STORAGE_FILE_NAME, "w") as fp:
@@ -38,3 +52,234 @@ class TempFileStorage:
                 lines.update(fp.readlines())
             return lines
         return set()
+
+
+def frecency(hits: int, last_used: float, now: float) -> int:
+    """
+    >>> frecency(3, 0, 2 * DAY)
+    300
+    >>> frecency(3, 0, 365 * DAY)
+    30
+    """
+    age = now - last_used
+    for max_age, weight in RECENCY_WEIGHTS:
+        if age <= max_age:
+            return hits * weight
+    return hits * OLD_WEIGHT
+
+
+def strip_scheme(url: str) -> str:
+    """
+    >>> strip_scheme("https://www.example.com/")
+    'example.com/'
+    """
+    _, _, rest = url.rpartition("://")
+    return rest[4:] if rest.startswith("www.") else rest
+
+
+class HistoryIndex:
+    """
+    Urls ranked by frecency. Prefixes of the url, with or without
+    scheme, are looked up in a sorted key list. Other substrings are
+    found in one joined string of all urls, or, when the phrase is
+    very common, by walking urls from the best ranked.
+
+    >>> index = HistoryIndex(now=DAY)
+    >>> index.add("http://localhost/", hits=1, last_used=0)
+    >>> index.add("http://localhost:5000/", hits=3, last_used=0)
+    >>> index.add("https://example.com/localhost", hits=9, last_used=0)
+    >>> index.find("loc", limit=2)
+    ['http://localhost:5000/', 'http://localhost/']
+    >>> index.find("loc", limit=3)[-1]
+    'https://example.com/localhost'
+    >>> index.find("host", limit=3)[0]
+    'https://example.com/localhost'
+    >>> len(index.find("", limit=5))
+    3
+    """
+
+    def __init__(self, now: Optional[float] = None) -> None:
+        self.now = now or time.time()
+        self._scores: Dict[str, int] = {}
+        self._keys: List[Tuple[str, str]] = []
+        self._ranked: List[Tuple[int, str]] = []
+        self._urls: List[str] = []
+        self._haystack = ""
+        self._offsets: List[int] = [0]
+
+    @classmethod
+    def build(cls, rows: Iterable[Tuple[str, int, float]]) -> "HistoryIndex":
+        index = cls()
+        for url, hits, last_used in rows:
+            index._scores[url] = frecency(hits, last_used, index.now)
+            index._urls.append(url)
+        index._keys = sorted(
+            (key, url) for url in index._urls for key in {url, strip_scheme(url)}
+        )
+        index._ranked = sorted(map(index._rank_key, index._urls))
+        index._haystack = "".join(url + "\n" for url in index._urls)
+        index._offsets = list(accumulate([0] + [len(url) + 1 for url in index._urls]))
+        return index
+
+    def add(self, url: str, hits: int, last_used: float):
+        if url in self._scores:
+            self._ranked.pop(bisect_left(self._ranked, self._rank_key(url)))
+        else:
+            for key in {url, strip_scheme(url)}:
+                insort(self._keys, (key, url))
+            self._urls.append(url)
+            self._haystack += url + "\n"
+            self._offsets.append(self._offsets[-1] + len(url) + 1)
+        self._scores[url] = frecency(hits, last_used, self.now)
+        insort(self._ranked, self._rank_key(url))
+
+    def _rank_key(self, url: str) -> Tuple[int, str]:
+        return (-self._scores[url], url)
+
+    def find(self, phrase: str, limit: int) -> List[str]:
+        found = self._find_prefixed(phrase, limit)
+        if phrase and len(found) < limit and "\n" not in phrase:
+            seen = set(found)
+            for url in self._find_containing(phrase, limit + len(found)):
+                if url not in seen:
+                    found.append(url)
+                    if len(found) == limit:
+                        break
+        return found
+
+    def _find_prefixed(self, phrase: str, limit: int) -> List[str]:
+        low = bisect_left(self._keys, (phrase,))
+        high = bisect_left(self._keys, (phrase + MAX_CHAR,), lo=low)
+        if high - low <= MAX_RANKED_CANDIDATES:
+            urls = {url for _, url in self._keys[low:high]}
+            return heapq.nsmallest(limit, urls, key=self._rank_key)
+        return self._walk_ranked(
+            lambda url: url.startswith(phrase) or strip_scheme(url).startswith(phrase),
+            limit,
+        )
+
+    def _find_containing(self, phrase: str, limit: int) -> List[str]:
+        urls = set()
+        find = self._haystack.find
+        position = find(phrase)
+        while position != -1:
+            if len(urls) == MAX_RANKED_CANDIDATES:
+                return self._walk_ranked(lambda url: phrase in url, limit)
+            index = bisect_right(self._offsets, position) - 1
+            urls.add(self._urls[index])
+            position = find(phrase, self._offsets[index + 1])
+        return heapq.nsmallest(limit, urls, key=self._rank_key)
+
+    def _walk_ranked(self, matches: Callable[[str], bool], limit: int) -> List[str]:
+        found = []
+        for _, url in self._ranked:
+            if matches(url):
+                found.append(url)
+                if len(found) == limit:
+                    break
+        return found
+
+
+class SQLiteStorage:
+    """
+    Keeps history in SQLite, so saving a url is a single upsert and
+    several chkapi instances can write at the same time. Urls are
+    found in an in-memory snapshot, which is reloaded in a thread
+    when another connection changed the database. Only the first
+    lookup waits for it.
+    """
+
+    path: Path
+
+    def __init__(self, path: Optional[Path] = None) -> None:
+        self.path = path or Path(gettempdir()) / DATABASE_FILE_NAME
+        self._connection: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._hits: Dict[str, int] = {}
+        self._index = HistoryIndex()
+        self._refreshing: Optional[asyncio.Future] = None
+        self._loaded = False
+        self._stale = False
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = self._connect()
+        return self._connection
+
+    def _connect(self) -> sqlite3.Connection:
+        is_new = not self.path.exists()
+        connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "url TEXT PRIMARY KEY, "
+            "hits INTEGER NOT NULL DEFAULT 1, "
+            "last_used REAL NOT NULL)"
+        )
+        if is_new:
+            self._import_file_history(connection)
+        return connection
+
+    def _import_file_history(self, connection: sqlite3.Connection):
+        lines = TempFileStorage()._load_existing_lines(self.path.parent)
+        now = time.time()
+        connection.executemany(
+            "INSERT OR IGNORE INTO urls (url, last_used) VALUES (?, ?)",
+            [(line.strip(), now) for line in lines if line.strip()],
+        )
+
+    async def save(self, url: str) -> None:
+        now = time.time()
+        self.connection.execute(
+            "INSERT INTO urls (url, last_used) VALUES (?, ?) "
+            "ON CONFLICT (url) DO UPDATE SET "
+            "hits = hits + 1, last_used = excluded.last_used",
+            (url, now),
+        )
+        if self._refreshing is not None:
+            self._stale = True
+        if self._loaded:
+            self._hits[url] = self._hits.get(url, 0) + 1
+            self._index.add(url, self._hits[url], now)
+
+    async def find(self, phrase: str, limit: int = AUTOCOMPLETE_LIMIT) -> list[str]:
+        refreshing = self._start_refresh()
+        if refreshing is not None and not self._loaded:
+            await asyncio.shield(refreshing)
+        return self._index.find(phrase, limit)
+
+    async def refresh(self):
+        """Reloads urls if another connection changed them."""
+        refreshing = self._start_refresh()
+        if refreshing is not None:
+            await asyncio.shield(refreshing)
+
+    def _start_refresh(self) -> Optional[asyncio.Future]:
+        if self._refreshing is None:
+            data_version = self.connection.execute("PRAGMA data_version").fetchone()
+            if data_version[0] != self._data_version:
+                self._refreshing = asyncio.ensure_future(self._reload(data_version[0]))
+        return self._refreshing
+
+    async def _reload(self, data_version: int):
+        try:
+            hits, index = await asyncio.get_event_loop().run_in_executor(
+                None, self._load_index
+            )
+            self._hits, self._index = hits, index
+            self._loaded = True
+            # urls saved meanwhile may be missing, so load again next time
+            self._data_version = None if self._stale else data_version
+        finally:
+            self._refreshing = None
+            self._stale = False
+
+    def _load_index(self) -> Tuple[Dict[str, int], HistoryIndex]:
+        connection = sqlite3.connect(self.path, timeout=5)
+        try:
+            rows = connection.execute("SELECT url, hits, last_used FROM urls")
+            rows = rows.fetchall()
+        finally:
+            connection.close()
+        return {url: hits for url, hits, _ in rows}, HistoryIndex.build(rows)
@@ -0,0 +1,54 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from chkapi.api_reader import Response
+
+MAX_TITLE_LENGTH = 30
+
+
+@dataclass
+class Tab:
+    """
+    A response tab. Its ContentView keeps the document, search results
+    and scroll position, so switching tabs doesn't fetch anything again.
+    """
+
+    body: Any
+    url: str = ""
+    response: Optional[Response] = None
+    response_time: Optional[float] = None
+    loaded_url: Optional[str] = None
+    next_url: Optional[str] = None
+    loading: Optional[asyncio.Future] = None
+    error: Optional[str] = None
+
+    def is_loading(self) -> bool:
+        return self.loading is not None and not self.loading.done()
+
+    def cancel(self) -> bool:
+        """Cancels loading, returns True if something was loading."""
+        if not self.is_loading():
+            return False
+        self.loading.cancel()
+        return True
+
+    @property
+    def title(self) -> str:
+        """
+        >>> Tab(None, url="http://localhost:5000/items?page=2").title
+        'localhost:5000/items?page=2'
+        >>> Tab(None, url="http://localhost/" + "a" * 40).title
+        'localhost/aaaaaaaaaaaaaaaaaaa…'
+        >>> Tab(None).title
+        'New tab'
+        """
+        if not self.url:
+            return "New tab"
+        url = urlparse(self.url)
+        title = url.netloc + url.path + (f"?{url.query}" if url.query else "")
+        title = title or self.url
+        if len(title) > MAX_TITLE_LENGTH:
+            title = title[: MAX_TITLE_LENGTH - 1] + "…"
+        return title
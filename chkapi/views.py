@@ -1,11 +1,37 @@
-from copy import deepcopy
+import asyncio
+import re
+import threading
+from bisect import bisect_left
+from json import JSONDecodeError
+from typing import Dict, List, Optional, Tuple
 
-from rich.json import JSON
+from rich.console import RenderableType
+from rich.text import Text
+from textual.geometry import clamp
+from textual.reactive import Reactive
+from textual.scrollbar import ScrollBarRender
 from textual.views import GridView
-from textual.widgets import Button, ScrollView
+from textual.widget import Widget
+from textual.widgets import Button
 
 import chkapi.widgets
-from chkapi.search import EmptySearchResults, SearchResults
+from chkapi.document import Document, DocumentCache
+from chkapi.events import (
+    FormattingChanged,
+    LinkSelected,
+    OpenLink,
+    SearchResultsChanged,
+)
+from chkapi.exceptions import SearchCancelled
+from chkapi.json_stream import IncrementalJSONParser
+from chkapi.links import Link
+from chkapi.profiler import profiler
+from chkapi.search import EmptySearchResults, SearchMode, SearchResults
+
+RENDER_MARGIN = 20
+SEARCH_DEBOUNCE = 0.05
+SEARCH_IN_THREAD_SIZE = 1024 * 1024
+SEARCH_REPORT_INTERVAL = 0.1
 
 
 class URLView(GridView):
@@ -36,46 +62,269 @@ class URLView(GridView):
         await self.url_field.focus()
 
 
-class ContentView(ScrollView):
-    content: JSON
-    raw_content: str
+class ContentView(Widget):
+    document: Optional[Document] = None
     search_results = EmptySearchResults()
+    parser: Optional[IncrementalJSONParser] = None
+    preview: list
+    pending_search: Optional[asyncio.Future] = None
+    links: List[Link] = []
+    selected_link: Optional[int] = None
+    formatting: bool = False
+    documents = DocumentCache()
+
+    x: Reactive[int] = Reactive(0)
+    y: Reactive[int] = Reactive(0)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._window: List[Text] = []
+        self._window_start = 0
+
+    def validate_x(self, value: int) -> int:
+        return clamp(value, 0, self.max_scroll_x)
+
+    def validate_y(self, value: int) -> int:
+        return clamp(value, 0, self.max_scroll_y)
+
+    @property
+    def max_scroll_x(self) -> int:
+        if self.document is None:
+            return 0
+        return max(0, self.document.width - self.size.width + 1)
+
+    @property
+    def max_scroll_y(self) -> int:
+        if self.document is None:
+            return 0
+        return max(0, len(self.document) - self.size.height)
+
+    async def start_streaming(self):
+        self.parser = IncrementalJSONParser()
+        self.preview = []
+
+    async def feed(self, chunk: str):
+        if self.parser is None:
+            return
+        try:
+            elements = self.parser.feed(chunk)
+        except JSONDecodeError:
+            self.parser = None
+            return
+        parser = self.parser
+        if elements:
+            self.preview.extend(elements[: self._page_size()])
+            preview = await asyncio.get_event_loop().run_in_executor(
+                None, Document.from_data, self._preview_data(parser)
+            )
+            if self.parser is not parser:
+                return
+            self.show(preview)
+            if len(preview) > self._page_size():
+                self.parser = None
+        if parser.done:
+            self.parser = None
+
+    def _preview_data(self, parser: IncrementalJSONParser):
+        if parser.container == "[":
+            return self.preview
+        data: Dict = {}
+        for key, value in self.preview:
+            if key == parser.member:
+                data.setdefault(key, []).append(value)
+            else:
+                data[key] = value
+        return data
+
+    def _page_size(self) -> int:
+        return max(self.size.height, 50)
 
     async def set_content(self, content):
-        self.content = JSON(content)
-        self.raw_content = content
-        await self.update(self.content)
-
-    async def search(self, value):
-        if self.content:
-            self.search_results = SearchResults(value, self.content.text.plain)
-            content = self._highlight_found_phrases()
-            await self.update(content, home=False)
-            self._scroll_to_selected(content)
-
-    def _highlight_found_phrases(self):
-        if len(self.search_results) == 0:
-            return self.content
-        content = deepcopy(self.content)
-        for result in self.search_results.all():
-            content.text.stylize("white on yellow", *result)
-        content.text.stylize("red on yellow", *self.search_results.selected())
-        return content
+        self.parser = None
+        self.show(await self._format(self.documents.from_body, content))
+
+    async def set_data(self, data):
+        self.parser = None
+        self.show(await self._format(Document.from_data, data))
+
+    async def _format(self, create, content) -> Document:
+        """Runs parsing and pretty printing in a thread, screen stays responsive."""
+        self.formatting = True
+        await self.emit(FormattingChanged(self, True))
+        try:
+            with profiler.span("format", "format"):
+                return await asyncio.get_event_loop().run_in_executor(
+                    None, create, content
+                )
+        finally:
+            self.formatting = False
+            self.emit_no_wait(FormattingChanged(self, False))
+
+    def show(self, document: Document):
+        with profiler.span("ContentView.show", "render", lines=len(document)):
+            self._show(document)
+
+    def _show(self, document: Document):
+        self.cancel_search()
+        if self.document is not None and self.document is not document:
+            self.document.clear_styles()
+        self.search_results = EmptySearchResults()
+        self.links = []
+        self.selected_link = None
+        self.document = document
+        self._window = []
+        self.x = self.y = 0
+        self.refresh()
+
+    def clear(self):
+        self.cancel_search()
+        self.parser = None
+        self.formatting = False
+        self.search_results = EmptySearchResults()
+        self.links = []
+        self.selected_link = None
+        if self.document is not None:
+            self.document.clear_styles()
+        self.document = None
+        self._window = []
+        self.refresh()
+
+    def set_links(self, links: List[Link]):
+        self.links = links
+        self.selected_link = None
+        self.refresh()
+
+    def visible_range(self) -> Tuple[int, int]:
+        """Offsets of the first and one past the last character on screen."""
+        if self.document is None:
+            return 0, 0
+        return (
+            self.document.offset_of_line(self.y),
+            self.document.offset_of_line(self.y + self.size.height),
+        )
+
+    async def select_link(self, step: int):
+        if not self.links:
+            return
+        if self.selected_link is None:
+            start, _ = self.visible_range()
+            index = bisect_left([link.start for link in self.links], start)
+            self.selected_link = (index if step > 0 else index - 1) % len(self.links)
+        else:
+            self.selected_link = (self.selected_link + step) % len(self.links)
+        link = self.links[self.selected_link]
+        start, stop = self.visible_range()
+        if not start <= link.start < stop:
+            self.scroll_to_center(self.document.line_at(link.start))
+        self.refresh()
+        await self.emit(LinkSelected(self, link.url))
+
+    async def search(self, value, mode: SearchMode = SearchMode.LITERAL):
+        self.cancel_search()
+        if self.document:
+            self.pending_search = asyncio.ensure_future(self._search(value, mode))
+
+    def cancel_search(self):
+        if self.pending_search is not None:
+            self.pending_search.cancel()
+            self.pending_search = None
+
+    async def _search(self, value, mode):
+        await asyncio.sleep(SEARCH_DEBOUNCE)
+        with profiler.span("search", "search", phrase=value):
+            try:
+                self.search_results = SearchResults(
+                    value, self.document.plain, mode=mode, previous=self.search_results
+                )
+            except re.error:
+                self.search_results = EmptySearchResults()
+            if not value:
+                self.search_results = EmptySearchResults()
+            if len(self.document.plain) < SEARCH_IN_THREAD_SIZE:
+                self.search_results.consume_all()
+            else:
+                await self._consume_in_thread(self.search_results)
+        self._scroll_to_selected()
+        self.refresh()
+        await self.report_search()
+
+    async def _consume_in_thread(self, results: SearchResults):
+        cancelled = threading.Event()
+
+        def consume():
+            try:
+                results.consume_all(cancelled.is_set)
+            except SearchCancelled:
+                pass
+
+        scan = asyncio.get_event_loop().run_in_executor(None, consume)
+        scrolled = False
+        try:
+            while not scan.done():
+                await asyncio.wait([scan], timeout=SEARCH_REPORT_INTERVAL)
+                if not scrolled and len(results):
+                    self._scroll_to_selected()
+                    scrolled = True
+                self.refresh()
+                await self.report_search()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def report_search(self):
+        await self.emit(
+            SearchResultsChanged(
+                self,
+                self.search_results.selected_index,
+                len(self.search_results),
+                self.search_results.complete,
+            )
+        )
+
+    def _highlight_found_phrases(
+        self, first_line: int, last_line: int
+    ) -> Dict[int, List[Tuple[int, int, str]]]:
+        highlights: Dict[int, List[Tuple[int, int, str]]] = {}
+        selected = self.search_results.selected()
+        found = self.search_results.between(
+            self.document.offset_of_line(first_line),
+            self.document.offset_of_line(last_line),
+        )
+        for result in found:
+            style = "red on yellow" if result == selected else "white on yellow"
+            for lineno, start, stop in self.document.line_spans(*result):
+                highlights.setdefault(lineno, []).append((start, stop, style))
+        return highlights
+
+    def _highlight_selected_link(
+        self, highlights: Dict[int, List[Tuple[int, int, str]]]
+    ):
+        if self.selected_link is None:
+            return
+        link = self.links[self.selected_link]
+        for lineno, start, stop in self.document.line_spans(link.start, link.stop):
+            highlights.setdefault(lineno, []).append((start, stop, "black on cyan"))
 
     async def clear_search_results(self):
         await self.focus()
-        await self.update(self.content)
+        self.cancel_search()
+        self.search_results = EmptySearchResults()
+        self.refresh()
+        await self.report_search()
 
     async def jump_to_next_search_result(self):
         self.search_results.select_next()
-        content = self._highlight_found_phrases()
-        await self.update(content, home=False)
-        self._scroll_to_selected(content)
+        self._scroll_to_selected()
+        self.refresh()
+        await self.report_search()
 
-    def _scroll_to_selected(self, content):
+    def _scroll_to_selected(self):
         if len(self.search_results) > 0:
             start = self.search_results.selected().start
-            self.scroll_to_center(self._lineno_from_offset(start, content))
+            self.scroll_to_center(self.document.line_at(start))
+
+    def scroll_to_center(self, line: int):
+        self.y = line - self.size.height // 2
 
     async def on_key(self, event):
         if event.key == "n":
@@ -83,9 +332,96 @@ class ContentView(ScrollView):
                 await self.jump_to_next_search_result()
         if event.key == "escape":
             if self.search_results:
+                self.cancel_search()
                 self.search_results.clear()
-                await self.update(self.content)
+                self.refresh()
+                await self.report_search()
                 await self.app.unbind("n")
+        await self.dispatch_key(event)
+
+    async def key_f(self):
+        await self.select_link(1)
+
+    async def key_F(self):
+        await self.select_link(-1)
+
+    async def key_enter(self):
+        if self.selected_link is not None:
+            await self.emit(OpenLink(self, self.links[self.selected_link].url))
+
+    async def key_down(self):
+        self.y += 1
+
+    async def key_up(self):
+        self.y -= 1
+
+    async def key_pagedown(self):
+        self.y += self.size.height
+
+    async def key_pageup(self):
+        self.y -= self.size.height
+
+    async def key_home(self):
+        self.x = self.y = 0
+
+    async def key_end(self):
+        self.x = 0
+        self.y = self.max_scroll_y
+
+    async def key_right(self):
+        self.x += 4
+
+    async def key_left(self):
+        self.x -= 4
+
+    async def on_mouse_scroll_up(self, event):
+        self.y += 2
+
+    async def on_mouse_scroll_down(self, event):
+        self.y -= 2
+
+    async def action_scroll_up(self):
+        await self.key_pageup()
+
+    async def action_scroll_down(self):
+        await self.key_pagedown()
+
+    def _visible_lines(self) -> List[Text]:
+        height = self.size.height
+        start = self.y - self._window_start
+        if start < 0 or start + height > len(self._window):
+            self._window_start = max(0, self.y - RENDER_MARGIN)
+            self._window = self.document.render_lines(
+                self._window_start, self.y + height + RENDER_MARGIN
+            )
+            start = self.y - self._window_start
+        return self._window[start : start + height]
+
+    def render(self) -> RenderableType:
+        with profiler.span("ContentView.render", "render"):
+            return self._render()
 
-    def _lineno_from_offset(self, offset, content):
-        return len(content.text[:offset].split("\n"))
+    def _render(self) -> RenderableType:
+        width, height = self.size
+        if self.document is None or not width or not height:
+            return ""
+        bar = ScrollBarRender.render_bar(
+            size=height,
+            virtual_size=len(self.document),
+            window_size=height,
+            position=self.y,
+        ).segments
+        highlights = self._highlight_found_phrases(self.y, self.y + height)
+        self._highlight_selected_link(highlights)
+        text = Text(no_wrap=True, overflow="crop", end="")
+        for i, line in enumerate(self._visible_lines()):
+            if self.y + i in highlights:
+                line = line.copy()
+                for start, stop, style in highlights[self.y + i]:
+                    line.stylize(style, start, stop)
+            line = line[self.x :]
+            line.truncate(width - 1, overflow="crop", pad=True)
+            text.append_text(line)
+            text.append(bar[i].text, bar[i].style)
+            text.append("\n")
+        return text
@@ -1,4 +1,5 @@
-from typing import Optional, cast
+import asyncio
+from typing import Awaitable, List, Optional, cast
 
 from rich import box
 from rich.align import Align
@@ -10,15 +11,40 @@ from textual.widget import Reactive, Widget
 from textual.widgets import Button, Footer
 from textual_inputs import TextInput
 
+from chkapi.api_reader import CacheStatus, Progress, Timing
+from chkapi.body_index import BodyMatch
 from chkapi.events import (
     CancelSearch,
     FinishSearch,
     FocusRecent,
+    OpenLink,
     Search,
+    SearchAll,
+    SearchResultsChanged,
     SetUrl,
     UrlChanged,
     UrlTyped,
 )
+from chkapi.load_test import LoadTestStats, format_stats
+from chkapi.search import SearchMode
+
+
+def format_size(size: float) -> str:
+    """
+    >>> format_size(512)
+    '512 B'
+    >>> format_size(2048)
+    '2.0 KB'
+    >>> format_size(3.5 * 1024 * 1024)
+    '3.5 MB'
+    """
+    if size < 1024:
+        return f"{size:.0f} B"
+    for unit in ("KB", "MB", "GB"):
+        size /= 1024
+        if size < 1024:
+            break
+    return f"{size:.1f} {unit}"
 
 
 class URLButton(Button, can_focus=True):
@@ -65,7 +91,7 @@ class URLField(TextInput):
     async def on_key(self, event: events.Key) -> None:
         if event.key == "enter":
             await self.emit(UrlChanged(self))
-        if event.key == "down":
+        elif event.key == "down":
             await self.emit(FocusRecent(self))
         else:
             await self.emit(UrlTyped(self))
@@ -136,20 +162,57 @@ class AutocompleteWidget(Widget):
         return Panel(text)
 
 
+class BodyMatchesWidget(AutocompleteWidget):
+    matches: List[BodyMatch]
+
+    def __init__(self) -> None:
+        self.matches = []
+        super().__init__()
+
+    def show_matches(self, matches: List[BodyMatch]):
+        self.matches = matches
+        self.show_recent([match.url for match in matches])
+
+    async def select_current(self):
+        await self.emit(OpenLink(self, self.urls[self.current]))
+        self.current = -1
+        self.hide()
+
+    def render(self):
+        text = Text(no_wrap=True, overflow="ellipsis")
+        for i, match in enumerate(self.matches):
+            style = "red on yellow" if self.current == i else ""
+            text.append(f"{match.url} @{match.offset} ", style)
+            text.append(match.snippet + "\n", style or "dim")
+        return Panel(text, title="Found in responses")
+
+
 class CommandPrompt(TextInput):
+    mode: SearchMode = SearchMode.LITERAL
+
     def on_mount(self):
         self.visible = False
 
     async def show(self):
         self.visible = True
+        self._update_title()
         await self.focus()
 
+    def _update_title(self):
+        self.title = f"Search ({self.mode.value}, Tab to change)"
+        self.refresh()
+
     async def hide(self):
         self.visible = False
         self.value = ""
 
     async def on_key(self, event: events.Key) -> None:
         event.prevent_default().stop()
+        if event.key == "ctrl+i":
+            self.mode = self.mode.next()
+            self._update_title()
+            await self.emit(Search(self, self.value, self.mode))
+            return
         await super().on_key(event)
         if event.key == "escape":
             await self.hide()
@@ -159,28 +222,91 @@ class CommandPrompt(TextInput):
             await self.hide()
             await self.emit(FinishSearch(self))
             return
-        await self.emit(Search(self, self.value))
+        await self.emit(Search(self, self.value, self.mode))
+
+
+class GlobalSearchPrompt(TextInput):
+    def on_mount(self):
+        self.visible = False
+        self.title = "Search all responses"
+
+    async def show(self):
+        self.visible = True
+        await self.focus()
+
+    async def hide(self):
+        self.visible = False
+        self.value = ""
+
+    async def on_key(self, event: events.Key) -> None:
+        event.prevent_default().stop()
+        if event.key == "escape":
+            await self.emit(CancelSearch(self))
+        elif event.key in ("enter", "down"):
+            await self.emit(FinishSearch(self))
+        else:
+            await super().on_key(event)
+            await self.emit(SearchAll(self, self.value))
 
 
 class ApiFooter(Footer):
     response_time: Reactive[Optional[float]] = Reactive(None)
+    progress: Reactive[Optional[Progress]] = Reactive(None)
+    matches: Reactive[Optional[SearchResultsChanged]] = Reactive(None)
+    cache_status: Reactive[Optional[CacheStatus]] = Reactive(None)
+    formatting: Reactive[bool] = Reactive(False)
 
     def on_mount(self):
         self.response_time = None
+        self.progress = None
+        self.matches = None
+        self.cache_status = None
+        self.formatting = False
 
     def render(self) -> RenderableType:
         content = cast(Text, super().render())
+        if self.matches:
+            content = Text.assemble(
+                content, Text(self._format_matches(), style="black on yellow")
+            )
+        if self.progress:
+            return Text.assemble(
+                content,
+                Text(self._format_progress(), style="black on yellow", justify="right"),
+            )
+        if self.formatting:
+            return Text.assemble(
+                content, Text("Formatting…", style="black on yellow", justify="right")
+            )
         if self.response_time:
             return Text.assemble(
                 content,
                 Text(
-                    f"Response time: {self.response_time:.2f}s",
+                    self._format_response_time(),
                     style="white on dark_green",
                     justify="right",
                 ),
             )
         return content
 
+    def _format_response_time(self) -> str:
+        response_time = f"Response time: {self.response_time:.2f}s"
+        if self.cache_status:
+            return f"{response_time}, cache {self.cache_status.value}"
+        return response_time
+
+    def _format_matches(self) -> str:
+        if not self.matches.found:
+            return " Searching… "
+        found = f"{self.matches.found}" + ("" if self.matches.complete else "+")
+        return f" Match {self.matches.selected + 1} of {found} "
+
+    def _format_progress(self) -> str:
+        received = format_size(self.progress.received)
+        if self.progress.total:
+            received += f" / {format_size(self.progress.total)}"
+        return f"Received {received} ({format_size(self.progress.rate)}/s)"
+
     def update_keys(self):
         self._key_text = None
         # self.refresh()
@@ -228,3 +354,113 @@ class HeadersWidget(Widget):
     def on_key(self, event):
         if event.key == "escape":
             self.hide()
+
+
+def format_timing(timing: Optional[Timing], width: int = 30) -> str:
+    """
+    >>> print(format_timing(Timing(total=0.4, wait=0.3, download=0.1), width=4))
+    Connect (DNS, TCP)  reused connection
+    TLS                 reused connection
+    Request                0.0 ms
+    Waiting (TTFB)       300.0 ms ███
+    Download             100.0 ms █
+    Total                400.0 ms ████
+    >>> format_timing(None)
+    'No network timing, response served from cache'
+    """
+    if timing is None:
+        return "No network timing, response served from cache"
+    phases = [
+        ("Connect (DNS, TCP)", timing.connect),
+        ("TLS", timing.tls),
+        ("Request", timing.send),
+        ("Waiting (TTFB)", timing.wait),
+        ("Download", timing.download),
+        ("Total", timing.total),
+    ]
+    lines = []
+    for name, seconds in phases:
+        if seconds is None:
+            lines.append(f"{name:<20}reused connection")
+            continue
+        bar = "█" * round(width * seconds / timing.total) if timing.total else ""
+        lines.append(f"{name:<20}{seconds * 1000:>6.1f} ms {bar}".rstrip())
+    return "\n".join(lines)
+
+
+class TimingWidget(Widget):
+    timing: Optional[Timing]
+
+    def on_mount(self):
+        self.visible = False
+        self.layout_offset_y = 3
+
+    def show(self, timing: Optional[Timing]):
+        self.timing = timing
+        self.visible = True
+
+    def hide(self):
+        self.visible = False
+
+    def render(self) -> RenderableType:
+        return Panel(format_timing(self.timing), title="Timing")
+
+    def on_key(self, event):
+        if event.key == "escape":
+            self.hide()
+
+
+class LoadTestWidget(Widget):
+    report: str
+    task: Optional[asyncio.Future] = None
+
+    def on_mount(self):
+        self.visible = False
+        self.layout_offset_y = 3
+
+    def run(self, load_test: Awaitable[LoadTestStats]):
+        self.hide()
+        self.report = "Starting…"
+        self.visible = True
+        self.task = asyncio.ensure_future(load_test)
+
+    def update_stats(self, stats: LoadTestStats):
+        self.report = format_stats(stats)
+        self.refresh()
+
+    def hide(self):
+        if self.task is not None:
+            self.task.cancel()
+        self.visible = False
+
+    def render(self) -> RenderableType:
+        return Panel(self.report, title="Load test")
+
+    def on_key(self, event):
+        if event.key == "escape":
+            self.hide()
+
+
+class TabsWidget(Widget):
+    titles: List[str]
+    current: int
+
+    def on_mount(self):
+        self.visible = False
+        self.titles = []
+        self.current = 0
+
+    def show(self, titles: List[str], current: int):
+        self.titles = titles
+        self.current = current
+        self.visible = len(titles) > 1
+        self.refresh()
+
+    def render(self) -> RenderableType:
+        tabs = Text(no_wrap=True, overflow="ellipsis")
+        for index, title in enumerate(self.titles):
+            style = "black on white" if index == self.current else "white on grey23"
+            tabs.append(f" {index + 1} {title} ", style=style)
+            tabs.append(" ")
+        tabs.append("^T new  ^W close  ^N/^P switch", style="dim")
+        return tabs
@@ -35,3 +35,10 @@ Feature: Autocomplete recent urls
         
         Then url "http://localhost:5000/" is selected
 
+    Scenario: Looking up after a pause in typing
+        Given lookups of recent urls are counted
+
+        When I write "http://loc"
+
+        Then recent urls were looked up 1 time
+        And I see "http://localhost/" on screen
@@ -26,3 +26,19 @@ Feature: Error handling
 	And I press "enter"
 
 	Then I see "Connection Error" on screen
+
+    Scenario: Cancel loading
+	When I write "http://localhost/"
+	And I press "enter"
+	And I press "escape"
+
+	Then I see "Request cancelled" on screen
+
+    Scenario: Load another url while loading
+	When I write "http://localhost/"
+	And I press "enter"
+	And I write "users"
+	And I press "enter"
+
+	Then previous request was cancelled
+	And I don't see "Request cancelled" on screen
@@ -0,0 +1,22 @@
+Feature: Links
+    Moving between urls found in response
+
+    Background:
+        Given server responds with data
+            {"name": "Ala", "owner": {"href": "http://localhost/users/1"}}
+        Given I focused url field
+        Given I wrote "http://localhost/"
+        Given I pressed "enter"
+
+    Scenario: Select link
+        Then I see "F.*Links" on screen
+
+        When I press "f"
+
+        Then I see "30;46mhttp://localhost/users/1" on screen
+
+    Scenario: Open link
+        When I press "f"
+        And I press "enter"
+
+        Then url "http://localhost/users/1" was requested
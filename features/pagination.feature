@@ -0,0 +1,17 @@
+Feature: Pagination
+    Following next page links of paginated responses
+
+    Background:
+        Given server responds with data
+            {"items": [1], "next": "http://localhost/?page=2"}
+        Given I focused url field
+        Given I wrote "http://localhost/"
+        Given I pressed "enter"
+
+    Scenario: Next page is detected
+        Then I see "].*Next page" on screen
+
+    Scenario: Merge all pages
+        When I press "a"
+
+        Then I see "1\x1b\[0m,[^\n]*\n *\S+1\x1b\[0m " on screen
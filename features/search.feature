@@ -31,3 +31,18 @@ Feature: Search in data
         Then I don't see "1;31;43mala.*?m1.*?:.*?m1" on screen
 
 
+    Scenario: Literal search
+        When I press "/"
+        And I write "a.a"
+        And I press "enter"
+
+        Then I don't see "43mala" on screen
+
+    Scenario: Regex search
+        When I press "/"
+        And I press "ctrl+i"
+        And I press "ctrl+i"
+        And I write "a.a2"
+        And I press "enter"
+
+        Then I see "1;31;43mala2" on screen
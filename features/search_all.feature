@@ -0,0 +1,29 @@
+Feature: Search in all responses
+    Finding values in bodies fetched before
+
+    Background:
+        Given server responds with data
+            {"token": "ABC-secret-123"}
+        Given I focused url field
+        Given I wrote "http://localhost/users"
+        Given I pressed "enter"
+
+    Scenario: Find response containing phrase
+        When I press "ctrl+f"
+        And I write "secret"
+
+        Then I see "http://localhost/users @15" on screen
+
+        When I press "escape"
+
+        Then I don't see "http://localhost/users @15" on screen
+
+    Scenario: Open found response
+        When I press "ctrl+t"
+        And I press "ctrl+f"
+        And I write "secret"
+        And I press "enter"
+        And I press "enter"
+
+        Then url "http://localhost/users" is loaded
+        And I see "2 localhost/users" on screen
@@ -31,3 +31,16 @@ Feature: Show data from url
 
 		Then I don't see "Header1.*val 1" on screen
 		Then I don't see "header-2.*val 2" on screen
+
+	Scenario: Show timing
+		Given server responds after waiting 0.25 seconds
+
+		When I write "http://localhost/"
+		And I press "enter"
+		And I press "t"
+
+		Then I see "Waiting \(TTFB\) +250.0 ms" on screen
+
+		When I press "escape"
+
+		Then I don't see "Waiting \(TTFB\)" on screen
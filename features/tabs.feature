@@ -0,0 +1,32 @@
+Feature: Tabs
+    Loading responses in parallel tabs
+
+    Background:
+        Given server responds with data
+            {"name": "Ala"}
+        Given I focused url field
+        Given I wrote "http://localhost/"
+        Given I pressed "enter"
+
+    Scenario: Open new tab
+        When I press "ctrl+t"
+        And I write "http://localhost/users"
+        And I press "enter"
+
+        Then I see "1 localhost/ .*2 localhost/users" on screen
+        And url "http://localhost/users" was requested
+
+    Scenario: Switch tabs
+        When I press "ctrl+t"
+        And I write "http://localhost/users"
+        And I press "enter"
+        And I press "ctrl+p"
+
+        Then url "http://localhost/" is loaded
+
+    Scenario: Close tab
+        When I press "ctrl+t"
+        And I press "ctrl+w"
+
+        Then I don't see "2 New tab" on screen
+        And url "http://localhost/" is loaded
@@ -3,6 +3,7 @@ from pytest_httpserver.httpserver import HTTPServer
 
 from chkapi.api_reader import URL, AsyncAPIReader
 from chkapi.exceptions import BadUrlException, HttpError
+from chkapi.spool import SpooledText
 
 
 @pytest.mark.asyncio
@@ -37,6 +38,17 @@ async def test_should_raise_http_error_when_status_is_404(httpserver: HTTPServer
         await reader.read_url(URL(url))
 
 
+@pytest.mark.asyncio
+async def test_should_raise_http_error_with_unknown_status(httpserver: HTTPServer):
+    httpserver.expect_request("/").respond_with_data("", status=520)
+
+    reader = AsyncAPIReader()
+
+    with pytest.raises(HttpError, match="520") as error:
+        await reader.read_url(URL(httpserver.url_for("/")))
+    assert error.value.status_code == 520
+
+
 @pytest.mark.asyncio
 async def test_should_raise_http_error_when_connection_error(httpserver: HTTPServer):
     path = "/"
@@ -60,3 +72,120 @@ async def test_should_get_headers_from_server(httpserver: HTTPServer):
     result = await reader.read_url(URL(url))
 
     assert result.headers["header"] == headers["header"]
+
+
+@pytest.mark.asyncio
+async def test_should_reuse_client_between_requests(httpserver: HTTPServer):
+    path = "/"
+    httpserver.expect_request(path).respond_with_data("{}")
+    url = httpserver.url_for(path)
+
+    reader = AsyncAPIReader()
+    await reader.read_url(URL(url))
+    client = reader.client
+    await reader.read_url(URL(url))
+
+    assert reader.client is client
+    await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_close_should_close_client(httpserver: HTTPServer):
+    path = "/"
+    httpserver.expect_request(path).respond_with_data("{}")
+    url = httpserver.url_for(path)
+
+    reader = AsyncAPIReader()
+    await reader.read_url(URL(url))
+    client = reader.client
+    await reader.close()
+
+    assert client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_should_report_download_progress(httpserver: HTTPServer):
+    path = "/"
+    body = '{"a": "' + "x" * 10000 + '"}'
+    httpserver.expect_request(path).respond_with_data(body)
+    url = httpserver.url_for(path)
+    progress = []
+
+    reader = AsyncAPIReader()
+    await reader.read_url(URL(url), on_progress=progress.append)
+
+    assert progress[-1].received == len(body)
+    assert progress[-1].total == len(body)
+
+
+@pytest.mark.asyncio
+async def test_should_truncate_body_larger_than_limit(httpserver: HTTPServer):
+    path = "/"
+    httpserver.expect_request(path).respond_with_data("x" * 1000)
+    url = httpserver.url_for(path)
+
+    reader = AsyncAPIReader(max_body_size=100)
+    result = await reader.read_url(URL(url))
+
+    assert result.body == "x" * 100
+    assert result.truncated
+
+
+@pytest.mark.asyncio
+async def test_should_spool_body_larger_than_spool_size(httpserver: HTTPServer):
+    path = "/"
+    body = '["zażółć", "' + "x" * 100000 + '"]'
+    httpserver.expect_request(path).respond_with_data(
+        body.encode(), content_type="application/json; charset=utf-8"
+    )
+    url = httpserver.url_for(path)
+
+    chunks = []
+
+    async def on_chunk(chunk):
+        chunks.append(chunk)
+
+    reader = AsyncAPIReader(spool_size=1000)
+    result = await reader.read_url(URL(url), on_chunk=on_chunk)
+
+    assert isinstance(result.body, SpooledText)
+    assert len("".join(chunks)) <= 1000
+    assert result.body[:] == body
+    assert result.size == len(body.encode())
+    await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_should_pass_decoded_chunks(httpserver: HTTPServer):
+    path = "/"
+    body = '["zażółć", "' + "x" * 100000 + '"]'
+    httpserver.expect_request(path).respond_with_data(
+        body.encode(), content_type="application/json; charset=utf-8"
+    )
+    url = httpserver.url_for(path)
+    chunks = []
+
+    async def on_chunk(chunk):
+        chunks.append(chunk)
+
+    reader = AsyncAPIReader()
+    result = await reader.read_url(URL(url), on_chunk=on_chunk)
+
+    assert "".join(chunks) == body
+    assert result.body == body
+
+
+@pytest.mark.asyncio
+async def test_should_measure_request_phases(httpserver: HTTPServer):
+    path = "/"
+    httpserver.expect_request(path).respond_with_data("{}")
+    url = httpserver.url_for(path)
+
+    reader = AsyncAPIReader()
+    result = await reader.read_url(URL(url))
+
+    assert result.timing.connect is not None
+    assert result.timing.tls is None
+    assert result.timing.wait > 0
+    assert result.timing.total >= result.timing.connect + result.timing.wait
+    await reader.close()
@@ -0,0 +1,113 @@
+import asyncio
+import io
+import json
+import subprocess
+import sys
+import time
+
+import pytest
+from pytest_httpserver.httpserver import HTTPServer
+
+from chkapi.api_reader import AsyncAPIReader, Response
+from chkapi.batch import run_batch
+
+
+@pytest.mark.asyncio
+async def test_should_report_every_url(httpserver: HTTPServer):
+    httpserver.expect_request("/ok").respond_with_data('{"a": 1}')
+    httpserver.expect_request("/missing").respond_with_data("", status=404)
+    urls = [httpserver.url_for("/ok"), httpserver.url_for("/missing"), "not url"]
+    results = []
+
+    reader = AsyncAPIReader()
+    all_ok = await run_batch(reader, urls, results.append, concurrency=2)
+
+    by_url = {result["url"]: result for result in results}
+    assert not all_ok
+    assert by_url[urls[0]]["status"] == 200
+    assert by_url[urls[0]]["size"] == 8
+    assert by_url[urls[0]]["timing"]["total"] > 0
+    assert by_url[urls[1]]["status"] == 404
+    assert not by_url[urls[1]]["ok"]
+    assert by_url["not url"]["error"] == "Invalid URL"
+    await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_should_limit_requests_per_host(httpserver: HTTPServer):
+    httpserver.expect_request("/").respond_with_data("{}")
+    running = 0
+    most_running = 0
+
+    class CountingReader(AsyncAPIReader):
+        async def read_url(self, url, **kwargs):
+            nonlocal running, most_running
+            running += 1
+            most_running = max(most_running, running)
+            try:
+                return await super().read_url(url, **kwargs)
+            finally:
+                running -= 1
+
+    reader = CountingReader()
+    urls = [httpserver.url_for("/")] * 10
+    await run_batch(reader, urls, lambda result: None, concurrency=5, per_host=2)
+
+    assert most_running == 2
+    await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_busy_host_does_not_hold_slots_of_other_hosts():
+    started = []
+
+    class SlowReader:
+        async def read_url(self, url, **kwargs):
+            started.append(url.url)
+            await asyncio.sleep(0.1)
+            return Response("{}", headers={})
+
+    urls = ["http://a/"] * 10 + ["http://b/"] * 10
+    await run_batch(SlowReader(), urls, lambda result: None, concurrency=5, per_host=2)
+
+    assert started[:4] == ["http://a/", "http://a/", "http://b/", "http://b/"]
+
+
+@pytest.mark.asyncio
+async def test_results_are_written_while_waiting_for_next_url():
+    events = []
+
+    class FastReader:
+        async def read_url(self, url, **kwargs):
+            return Response("{}", headers={})
+
+    def slow_urls():
+        yield "http://a/1"
+        time.sleep(0.3)
+        events.append("read")
+        yield "http://a/2"
+
+    await run_batch(FastReader(), slow_urls(), lambda r: events.append(r["url"]))
+
+    assert events == ["http://a/1", "read", "http://a/2"]
+
+
+def test_batch_runs_without_textual(httpserver: HTTPServer, tmp_path):
+    httpserver.expect_request("/").respond_with_data("{}")
+    urls = tmp_path / "urls.txt"
+    urls.write_text(httpserver.url_for("/") + "\n")
+    script = (
+        "import sys\n"
+        "from chkapi import cli\n"
+        "try:\n"
+        f"    cli.main(['batch', {str(urls)!r}])\n"
+        "except SystemExit as e:\n"
+        "    assert e.code == 0\n"
+        "assert 'textual' not in sys.modules\n"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    ).stdout
+
+    assert json.load(io.StringIO(output))["status"] == 200
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from chkapi.body_index import BodyIndex, BodyMatch
+
+
+@pytest.fixture()
+def index(tmp_path):
+    index = BodyIndex(tmp_path / "index.db")
+    yield index
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_finds_urls_and_offsets_of_phrase(index):
+    await index.add("http://localhost/a", '{"token": "ABC-secret-123"}')
+    await index.add("http://localhost/b", '{"name": "Ala"}')
+
+    matches = await index.search("SECRET")
+
+    assert matches == [
+        BodyMatch("http://localhost/a", 15, '{"token": "ABC-secret-123"}')
+    ]
+
+
+@pytest.mark.asyncio
+async def test_newer_body_replaces_previous_one(index):
+    await index.add("http://localhost/", '{"name": "Ala"}')
+    await index.add("http://localhost/", '{"name": "Ola"}')
+
+    assert await index.search("Ala") == []
+    assert [m.url for m in await index.search("Ola")] == ["http://localhost/"]
+    assert len(index) == 1
+
+
+@pytest.mark.asyncio
+async def test_unchanged_body_is_not_indexed_again(index):
+    assert await index.add("http://localhost/", '{"name": "Ala"}')
+    assert not await index.add("http://localhost/", '{"name": "Ala"}')
+
+
+@pytest.mark.asyncio
+async def test_oldest_bodies_are_dropped_over_size_limit(index):
+    index.max_size = 30
+    await index.add("http://localhost/1", '{"name": "first"}')
+    await index.add("http://localhost/2", '{"name": "second"}')
+
+    assert await index.search("first") == []
+    assert len(index) == 1
+
+
+@pytest.mark.asyncio
+async def test_old_bodies_are_dropped(index):
+    await index.add("http://localhost/1", '{"name": "first"}')
+    index.connection.execute("UPDATE bodies SET indexed_at = ?", (time.time() - 100,))
+    index.max_age = 10
+    await index.add("http://localhost/2", '{"name": "second"}')
+
+    assert [m.url for m in await index.search("name")] == ["http://localhost/2"]
+
+
+@pytest.mark.asyncio
+async def test_phrase_is_not_read_as_query(index):
+    await index.add("http://localhost/", '{"query": "a OR b"}')
+
+    assert len(await index.search('"a OR b"')) == 1
+    assert await index.search("a OR c") == []
@@ -0,0 +1,125 @@
+import asyncio
+
+import httpx
+import pytest
+from pytest_httpserver.httpserver import HTTPServer
+from werkzeug.wrappers import Response as WerkzeugResponse
+
+from chkapi.api_reader import URL, AsyncAPIReader, CacheStatus
+from chkapi.cache import CacheEntry, CachingAPIReader, ResponseCache
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db")
+    yield cache
+    cache.close()
+
+
+def respond_with_etag(request):
+    if request.headers.get("If-None-Match") == '"v1"':
+        return WerkzeugResponse(status=304, headers={"ETag": '"v1"'})
+    return WerkzeugResponse('{"a": 1}', headers={"ETag": '"v1"'})
+
+
+@pytest.mark.asyncio
+async def test_should_revalidate_with_etag(httpserver: HTTPServer, cache):
+    httpserver.expect_request("/").respond_with_handler(respond_with_etag)
+    reader = CachingAPIReader(AsyncAPIReader(), cache)
+
+    first = await reader.read_url(URL(httpserver.url_for("/")))
+    second = await reader.read_url(URL(httpserver.url_for("/")))
+
+    assert first.cache_status is CacheStatus.MISS
+    assert second.cache_status is CacheStatus.REVALIDATED
+    assert second.body == '{"a": 1}'
+    await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_should_send_if_modified_since(httpserver: HTTPServer, cache):
+    modified = "Wed, 21 Oct 2015 07:28:00 GMT"
+    httpserver.expect_request(
+        "/", headers={"If-Modified-Since": modified}
+    ).respond_with_data("", status=304)
+    httpserver.expect_request("/").respond_with_data(
+        "{}", headers={"Last-Modified": modified}
+    )
+    reader = CachingAPIReader(AsyncAPIReader(), cache)
+
+    await reader.read_url(URL(httpserver.url_for("/")))
+    result = await reader.read_url(URL(httpserver.url_for("/")))
+
+    assert result.cache_status is CacheStatus.REVALIDATED
+    await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_should_serve_fresh_response_without_request(
+    httpserver: HTTPServer, cache
+):
+    httpserver.expect_oneshot_request("/").respond_with_data(
+        "{}", headers={"Cache-Control": "max-age=60"}
+    )
+    reader = CachingAPIReader(AsyncAPIReader(), cache)
+
+    await reader.read_url(URL(httpserver.url_for("/")))
+    result = await reader.read_url(URL(httpserver.url_for("/")))
+
+    assert result.cache_status is CacheStatus.HIT
+    assert result.body == "{}"
+    await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_should_not_store_no_store_responses(httpserver: HTTPServer, cache):
+    httpserver.expect_request("/").respond_with_data(
+        "{}", headers={"Cache-Control": "no-store"}
+    )
+    reader = CachingAPIReader(AsyncAPIReader(), cache)
+
+    await reader.read_url(URL(httpserver.url_for("/")))
+
+    assert cache.get(httpserver.url_for("/")) is None
+    await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_offline_should_return_cached_and_revalidate_in_background(
+    httpserver: HTTPServer, cache
+):
+    url = httpserver.url_for("/")
+    cache.put(CacheEntry(url, "old", httpx.Headers({"ETag": '"v0"'}), 0))
+    httpserver.expect_request("/").respond_with_data("new", headers={"ETag": '"v1"'})
+    reader = CachingAPIReader(AsyncAPIReader(), cache, offline=True)
+
+    result = await reader.read_url(URL(url))
+    await asyncio.gather(*reader._revalidations)
+
+    assert result.body == "old"
+    assert result.cache_status is CacheStatus.HIT
+    assert cache.get(url).body == "new"
+    await reader.close()
+
+
+def test_should_keep_cache_on_disk(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db")
+    cache.put(CacheEntry("http://a/", "{}", httpx.Headers({"ETag": "1"}), 0))
+    cache.close()
+
+    entry = ResponseCache(tmp_path / "cache.db").get("http://a/")
+
+    assert entry.body == "{}"
+    assert entry.headers["etag"] == "1"
+
+
+def test_should_drop_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db", max_size=250, max_memory_size=150)
+    for name in "abc":
+        cache.put(CacheEntry(f"http://{name}/", "x" * 100, httpx.Headers(), 0))
+        if name == "b":
+            cache.get("http://a/")
+
+    assert cache.get("http://b/") is None
+    assert cache.get("http://a/") is not None
+    assert list(cache._memory) == ["http://a/"]
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+
+from chkapi import __version__
+
+IMPORT_TIME_BUDGET = 0.15
+HEAVY_MODULES = ("httpx", "textual", "textual_inputs", "rich", "sqlite3")
+
+
+def import_times(*args):
+    """Cumulative import times in seconds of modules imported by python."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1_000_000
+    return times
+
+
+def test_cli_imports_within_budget():
+    times = import_times("-c", "import chkapi.cli")
+
+    assert times["chkapi.cli"] < IMPORT_TIME_BUDGET
+    assert not [module for module in times if module.startswith(HEAVY_MODULES)]
+
+
+def test_version_is_shown_without_loading_anything():
+    output = subprocess.run(
+        [sys.executable, "-c", "from chkapi import cli\ncli.main(['--version'])"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert output.strip() == __version__
+    assert not [
+        module
+        for module in import_times("-m", "chkapi.cli", "--version")
+        if module.startswith(HEAVY_MODULES + ("asyncio",))
+    ]
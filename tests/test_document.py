@@ -0,0 +1,141 @@
+import asyncio
+import gc
+import json
+import weakref
+
+import pytest
+
+from chkapi import document
+from chkapi.document import Document, DocumentCache
+from chkapi.search import SearchMode
+from chkapi.spool import SpooledText
+from chkapi.views import ContentView
+
+BODY = json.dumps(
+    [{"id": i, "name": f"item {i}", "tags": ["a", "ż"]} for i in range(50000)]
+)
+
+
+@pytest.mark.asyncio
+async def test_formatting_runs_in_worker():
+    view = ContentView()
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    ticker = asyncio.ensure_future(tick())
+    await view.set_content(BODY)
+    ticker.cancel()
+
+    assert len(view.document) > 50000
+    assert ticks > 1
+    assert not view.formatting
+
+
+def test_json_module_gives_same_document_as_orjson(monkeypatch):
+    formatted = Document.from_body(BODY).plain
+    monkeypatch.setattr(document, "orjson", None)
+
+    assert Document.from_body(BODY).plain == formatted
+
+
+def test_oversized_body_is_plain_text():
+    doc = Document.from_body(BODY, max_size=len(BODY) - 1)
+
+    assert doc.plain == BODY
+    assert len(doc) == 1
+
+
+@pytest.mark.asyncio
+async def test_same_body_is_not_formatted_again(monkeypatch):
+    formatted = []
+    from_body = Document.from_body
+    monkeypatch.setattr(
+        Document,
+        "from_body",
+        lambda body: formatted.append(body) or from_body(body),
+    )
+    monkeypatch.setattr(ContentView, "documents", DocumentCache())
+    first, second = ContentView(), ContentView()
+
+    await first.set_content(BODY)
+    await second.set_content(BODY)
+
+    assert formatted == [BODY]
+    assert second.document is first.document
+
+
+@pytest.mark.asyncio
+async def test_preview_shows_first_items_of_wrapped_array():
+    body = json.dumps({"data": json.loads(BODY), "meta": {"total": 50000}})
+    view = ContentView()
+    await view.start_streaming()
+
+    await view.feed(body[:1000])
+
+    assert view.document.line(2) == "    {"
+    assert '"data": [' in view.document.line(1)
+
+
+def test_document_cache_evicts_by_memory():
+    small = '{"a": 1}'
+    cache = DocumentCache(max_size=Document.from_body(BODY).size)
+
+    cache.from_body(small)
+    cache.from_body(BODY)
+
+    assert len(cache) == 1
+    assert cache.size <= cache.max_size
+    assert cache.from_body(BODY) is cache.from_body(BODY)
+
+
+@pytest.mark.asyncio
+async def test_document_drops_highlighted_lines_when_not_shown():
+    view = ContentView()
+    await view.set_content(BODY)
+    previous = view.document
+    previous.render_lines(0, 50)
+
+    await view.set_content('{"a": 1}')
+
+    assert not previous._styled
+
+
+@pytest.mark.asyncio
+async def test_spooled_body_is_searched_and_rendered_from_file():
+    view = ContentView()
+    await view.set_content(SpooledText.from_parts([BODY]))
+
+    await view.search("ITEM 49999", SearchMode.IGNORE_CASE)
+    await view.pending_search
+
+    start, stop = view.search_results.selected()
+    line = view.document.line_at(start)
+    assert (
+        view.document.line(line)[
+            slice(*list(view.document.line_spans(start, stop))[0][1:])
+        ]
+        == "item 49999"
+    )
+    assert view.document.width < document.WRAP_SIZE
+    assert "item 0" in view.document.render_lines(0, 1)[0].plain
+
+
+@pytest.mark.asyncio
+async def test_spooled_body_is_released_when_replaced():
+    view = ContentView()
+    body = SpooledText.from_parts([BODY])
+    released = weakref.ref(body)
+    await view.set_content(body)
+    await view.search("item", SearchMode.LITERAL)
+    await view.pending_search
+
+    del body
+    await view.set_content('{"a": 1}')
+    gc.collect()
+
+    assert released() is None
@@ -5,14 +5,14 @@ import re
 import tempfile
 from asyncio.futures import Future
 from io import StringIO
-from unittest.mock import MagicMock, Mock
+from unittest.mock import AsyncMock, MagicMock, Mock
 
 import pytest
 from pytest_bdd import given, parsers, scenarios, then, when
 from rich.console import Console
 from textual.events import Key
 
-from chkapi.api_reader import Response
+from chkapi.api_reader import URL, Response, Timing
 from chkapi.app import CheckApiApp
 from chkapi.exceptions import HttpError
 
@@ -51,6 +51,7 @@ def create_app():
 def mock_api_reader():
     api_reader = MagicMock()
     api_reader.read_url = Mock(return_value=Future())
+    api_reader.close = AsyncMock()
     return api_reader
 
 
@@ -92,6 +93,12 @@ def server_responds_with_headers(headers, app):
     app.api_reader.read_url.return_value.set_result(response)
 
 
+@given(parsers.parse("server responds after waiting {wait:f} seconds"))
+def server_responds_after_waiting(wait, app):
+    response = Response("{}", headers={}, timing=Timing(total=wait, wait=wait))
+    app.api_reader.read_url.return_value.set_result(response)
+
+
 @given(parsers.parse('url "{url}" was used in the past'))
 def url_was_used(url, app, event_loop):
     press("ctrl+l", app, event_loop)
@@ -106,6 +113,16 @@ def delete(text, app, event_loop):
         event_loop.run_until_complete(app.post_message(Key(app, key="ctrl+h")))
 
 
+@given("lookups of recent urls are counted")
+def count_lookups(app):
+    app.storage.find = AsyncMock(side_effect=app.storage.find)
+
+
+@then(parsers.parse("recent urls were looked up {count:d} time"))
+def recent_urls_were_looked_up(count, app):
+    assert app.storage.find.await_count == count
+
+
 @given("I focused url field")
 def focus_url_field(app, event_loop):
     event_loop.run_until_complete(app.post_message(Key(app, key="ctrl+l")))
@@ -124,6 +141,23 @@ def dont_see(text, app):
     assert not re.search(text, screen(app)), f'"{text} found'
 
 
+@then(parsers.parse('url "{url}" was requested'))
+def url_was_requested(url, app):
+    assert URL(url) in [call.args[0] for call in app.api_reader.read_url.call_args_list]
+    assert app.loaded_url == url
+
+
+@then(parsers.parse('url "{url}" is loaded'))
+def url_is_loaded(url, app):
+    assert app.loaded_url == url
+    assert app.url_view.url == url
+
+
+@then("previous request was cancelled")
+def previous_request_was_cancelled(app):
+    assert app.api_reader.read_url.return_value.cancelled()
+
+
 @then(parsers.parse('url "{url}" is selected'))
 def url_is_selected(url, app):
     see(f"31;43m{url}", app)
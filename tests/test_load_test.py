@@ -0,0 +1,55 @@
+import pytest
+from pytest_httpserver.httpserver import HTTPServer
+
+from chkapi.api_reader import URL, AsyncAPIReader
+from chkapi.cli import main
+from chkapi.load_test import LatencyHistogram, run_load_test
+
+
+@pytest.mark.asyncio
+async def test_should_send_requested_number_of_requests(httpserver: HTTPServer):
+    httpserver.expect_request("/").respond_with_data("{}")
+    updates = []
+
+    reader = AsyncAPIReader()
+    stats = await run_load_test(
+        reader, URL(httpserver.url_for("/")), 20, 5, on_update=updates.append
+    )
+
+    assert len(httpserver.log) == 20
+    assert len(stats.histogram) == 20
+    assert stats.completed == 20
+    assert updates[-1] is stats
+    await reader.close()
+
+
+@pytest.mark.asyncio
+async def test_should_count_errors_by_status(httpserver: HTTPServer):
+    httpserver.expect_request("/").respond_with_data("", status=503)
+
+    reader = AsyncAPIReader()
+    stats = await run_load_test(reader, URL(httpserver.url_for("/")), 3, 2)
+
+    assert stats.errors == {503: 3}
+    assert len(stats.histogram) == 0
+    await reader.close()
+
+
+def test_histogram_memory_does_not_grow():
+    histogram = LatencyHistogram()
+    size = len(histogram.counts)
+    for i in range(100000):
+        histogram.add(i / 1000)
+
+    assert len(histogram.counts) == size
+    assert histogram.percentile(50) == pytest.approx(50, rel=0.05)
+
+
+def test_load_subcommand_prints_report(httpserver: HTTPServer, capsys):
+    httpserver.expect_request("/").respond_with_data("{}")
+
+    with pytest.raises(SystemExit) as exit:
+        main(["load", httpserver.url_for("/"), "-n", "4", "-c", "2"])
+
+    assert exit.value.code == 0
+    assert "Requests 4 of 4" in capsys.readouterr().out
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from chkapi.api_reader import Response
+from chkapi.exceptions import PaginationError
+from chkapi.pagination import follow_pages, next_page_url
+
+
+def test_should_find_next_page_in_link_header():
+    response = Response("[]", headers={"link": '</items?page=3>; rel="next"'})
+
+    assert next_page_url("http://a/items?page=2", response) == "http://a/items?page=3"
+
+
+def test_link_header_should_win_over_body():
+    response = Response("", headers={"link": '<http://a/?page=2>; rel="next"'})
+
+    assert next_page_url("http://a/", response, {"next": "/other"}) == (
+        "http://a/?page=2"
+    )
+
+
+def test_should_not_return_same_url_as_next():
+    response = Response("", headers={})
+
+    assert next_page_url("http://a/?cursor=1", response, {"cursor": "1"}) is None
+
+
+def pages(count):
+    return {
+        f"http://a/?page={i}": Response(
+            json.dumps({"data": [i], "next": f"/?page={i + 1}" if i < count else None}),
+            headers={},
+        )
+        for i in range(1, count + 1)
+    }
+
+
+async def collect(responses, **limits):
+    async def read(url):
+        return responses[url]
+
+    first = "http://a/?page=1"
+    return [
+        page async for page in follow_pages(read, first, responses[first], **limits)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_should_follow_all_pages():
+    result = await collect(pages(3))
+
+    assert [page.items for page in result] == [[1], [2], [3]]
+    assert result[-1].next_url is None
+
+
+@pytest.mark.asyncio
+async def test_should_stop_at_page_limit():
+    result = await collect(pages(5), max_pages=2)
+
+    assert len(result) == 2
+    assert result[-1].next_url == "http://a/?page=3"
+
+
+@pytest.mark.asyncio
+async def test_should_stop_at_size_limit():
+    result = await collect(pages(5), max_size=1)
+
+    assert len(result) == 1
+
+
+@pytest.mark.asyncio
+async def test_should_stop_at_page_that_is_not_json():
+    responses = pages(3)
+    responses["http://a/?page=2"] = Response("<html>", headers={})
+    items = []
+
+    async def read(url):
+        return responses[url]
+
+    first = "http://a/?page=1"
+    with pytest.raises(PaginationError, match="page=2 is not JSON"):
+        async for page in follow_pages(read, first, responses[first]):
+            items.append(page.items)
+
+    assert items == [[1]]
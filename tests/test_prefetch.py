@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from chkapi.api_reader import Progress, Response
+from chkapi.prefetch import Prefetcher
+
+
+@pytest.mark.asyncio
+async def test_prefetcher_should_return_prefetched_response():
+    reads = []
+
+    class Reader:
+        async def read_url(self, url, **kwargs):
+            reads.append(url.url)
+            return Response("{}", headers={})
+
+    prefetcher = Prefetcher(Reader())
+    prefetcher.prefetch("http://a/")
+    prefetcher.prefetch("http://a/")
+    await asyncio.sleep(0)
+
+    assert (await prefetcher.take("http://a/")).body == "{}"
+    assert await prefetcher.take("http://a/") is None
+    assert reads == ["http://a/"]
+
+
+@pytest.mark.asyncio
+async def test_prefetcher_should_drop_oldest():
+    class Reader:
+        async def read_url(self, url, **kwargs):
+            return Response("x" * 10, headers={})
+
+    prefetcher = Prefetcher(Reader(), max_entries=5, max_size=25)
+    for i in range(4):
+        prefetcher.prefetch(f"http://a/{i}")
+    await asyncio.sleep(0.01)
+
+    assert [f"http://a/{i}" in prefetcher for i in range(4)] == [
+        False,
+        False,
+        True,
+        True,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_prefetcher_should_abandon_too_large_response():
+    class Reader:
+        async def read_url(self, url, on_progress=None, **kwargs):
+            on_progress(Progress(received=100, total=None, elapsed=0.1))
+            return Response("x" * 100, headers={})
+
+    prefetcher = Prefetcher(Reader(), max_size=50)
+    prefetcher.prefetch("http://a/")
+
+    assert await prefetcher.take("http://a/") is None
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from chkapi.profiler import Profiler
+
+
+@pytest.mark.asyncio
+async def test_blocked_loop_is_recorded_as_lag():
+    profiler = Profiler()
+    profiler.start(trace_memory=False)
+    watch = asyncio.ensure_future(profiler.watch_loop(interval=0.01))
+    await asyncio.sleep(0.02)
+
+    time.sleep(0.1)
+    await asyncio.sleep(0.02)
+    watch.cancel()
+
+    lags = [e["args"]["ms"] for e in profiler.events if e["name"] == "loop lag"]
+    assert max(lags) > 50
+
+
+def test_load_records_allocation_peak():
+    profiler = Profiler()
+    profiler.start()
+    try:
+        with profiler.load("http://a/"):
+            data = bytearray(10 * 2**20)
+        del data
+    finally:
+        profiler.stop()
+
+    peaks = [e["args"]["mb"] for e in profiler.events if e["name"] == "allocation peak"]
+    assert peaks[0] >= 10
+
+
+def test_trace_is_written_in_chrome_format(tmp_path):
+    profiler = Profiler()
+    profiler.start(trace_memory=False)
+    with profiler.span("handle_url_changed", url="http://a/"):
+        pass
+
+    trace = json.loads(profiler.write(tmp_path / "trace.json").read_text())
+
+    span = [e for e in trace["traceEvents"] if e["ph"] == "X"][0]
+    assert span["name"] == "handle_url_changed"
+    assert span["tid"] == 1 and span["dur"] >= 0
+    assert span["args"] == {"url": "http://a/"}
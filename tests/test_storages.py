@@ -1,9 +1,10 @@
+import asyncio
 import os
 import tempfile
 
 import pytest
 
-from chkapi.storages import STORAGE_FILE_NAME, TempFileStorage
+from chkapi.storages import STORAGE_FILE_NAME, SQLiteStorage, TempFileStorage
 
 
 @pytest.fixture(autouse=True)
@@ -46,3 +47,75 @@ async def test_search_in_file(tmp_path):
     result = await storage.find("local")
 
     assert result == ["http://localhost/"]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_finds_saved_urls():
+    storage = SQLiteStorage()
+    await storage.save("http://localhost/")
+    await storage.save("http://127.0.0.1/")
+    await storage.save("http://localhost/")
+
+    assert await storage.find("local") == ["http://localhost/"]
+    assert await storage.find("http") == ["http://localhost/", "http://127.0.0.1/"]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_limits_results():
+    storage = SQLiteStorage()
+    for i in range(20):
+        await storage.save(f"http://localhost/{i}")
+    await storage.save("http://localhost/7")
+
+    result = await storage.find("http://localhost/", limit=5)
+
+    assert len(result) == 5
+    assert result[0] == "http://localhost/7"
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_sees_urls_saved_by_other_instance():
+    storage = SQLiteStorage()
+    await storage.find("http")
+
+    await SQLiteStorage().save("http://localhost/")
+    await storage.refresh()
+
+    assert await storage.find("http") == ["http://localhost/"]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_finds_in_snapshot_while_reloading():
+    storage = SQLiteStorage()
+    await storage.save("http://localhost/")
+    await storage.find("http")
+
+    await SQLiteStorage().save("http://127.0.0.1/")
+
+    assert await storage.find("http") == ["http://localhost/"]
+    await storage.refresh()
+    assert len(await storage.find("http")) == 2
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_keeps_urls_saved_while_reloading():
+    storage = SQLiteStorage()
+    await SQLiteStorage().save("http://localhost/")
+    refreshing = asyncio.ensure_future(storage.refresh())
+    await asyncio.sleep(0)
+
+    await storage.save("http://127.0.0.1/")
+    await refreshing
+    await storage.refresh()
+
+    assert len(await storage.find("http")) == 2
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_imports_file_history(tmp_path):
+    with open(tmp_path / STORAGE_FILE_NAME, "w") as fp:
+        fp.write("http://localhost/\nhttp://127.0.0.1")
+
+    storage = SQLiteStorage()
+
+    assert await storage.find("http") == ["http://127.0.0.1", "http://localhost/"]